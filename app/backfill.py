@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+from .settings import settings
+from .normalizer import load_alias_map
+from .tasks import SCRAPERS, history_sources, ingest_date
+from . import sqlite_store
+
+def _load_checkpoint(path: str, sources: List[str]) -> set:
+    """Даты, уже собранные этим же набором источников"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if sorted(checkpoint.get("sources", [])) != sorted(sources):
+        print(f"Checkpoint {path} was written for sources {checkpoint.get('sources')}, starting over")
+        return set()
+    return set(checkpoint.get("done", []))
+
+def _save_checkpoint(path: str, sources: List[str], done: set):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"sources": sorted(sources), "done": sorted(done)}, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def backfill(date_from: date, date_to: date, sources: Optional[List[str]] = None,
+                   checkpoint_path: Optional[str] = None, concurrency: Optional[int] = None) -> dict:
+    """Сбор снимков за диапазон дат в историю SQLite
+
+    Даты обрабатываются параллельно (не больше concurrency одновременно),
+    вежливость к хостам обеспечивают общий лимитер и пул соединений.
+    Дата попадает в checkpoint, только если все источники отработали без ошибок,
+    поэтому повторный запуск догружает только недостающее.
+    """
+    checkpoint_path = checkpoint_path or settings.BACKFILL_CHECKPOINT_PATH
+    concurrency = concurrency or settings.BACKFILL_CONCURRENCY
+
+    names, unsupported = history_sources(sources or list(SCRAPERS))
+    if unsupported:
+        print(f"Skipping sources without history pages: {unsupported}")
+    if not names:
+        raise ValueError("None of the requested sources can fetch past dates")
+
+    done = _load_checkpoint(checkpoint_path, names)
+    days = []
+    day = date_from
+    while day <= date_to:
+        if day.strftime("%Y-%m-%d") not in done:
+            days.append(day)
+        day += timedelta(days=1)
+    print(f"Backfilling {len(days)} dates with {names} ({len(done)} already done)")
+
+    alias_map = await load_alias_map(settings.TEAMLIST_CSV_URL)
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = []
+    started = time.monotonic()
+
+    async def run_day(day: date):
+        async with semaphore:
+            et_date_str = day.strftime("%Y-%m-%d")
+            try:
+                snap, errors = await ingest_date(day, names, alias_map)
+                await sqlite_store.save_snapshot(snap)
+            except Exception as e:
+                errors = [str(e)]
+                snap = None
+            if errors:
+                failed.append(et_date_str)
+                print(f"{et_date_str}: errors {errors}")
+                return
+            done.add(et_date_str)
+            _save_checkpoint(checkpoint_path, names, done)
+            print(f"{et_date_str}: {len(snap.rows)} games")
+
+    await asyncio.gather(*(run_day(day) for day in days))
+
+    summary = {
+        "dates": len(days),
+        "failed": sorted(failed),
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    print(f"Backfill finished: {summary}")
+    return summary
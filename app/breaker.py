@@ -0,0 +1,71 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+from .settings import settings
+
+class CircuitBreaker:
+    """Предохранитель по источникам: после серии неудач источник пропускается на время остывания
+
+    Состояние хранится в JSON между запусками:
+    {source: {"failures": n, "open_until": ts, "last_error": str, "last_success": ts}}
+    После остывания источник пробуется снова (half-open): успех закрывает
+    предохранитель, неудача сразу открывает его на следующий период.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _source(self, source: str) -> dict:
+        return self._load().setdefault(source, {"failures": 0, "open_until": 0.0})
+
+    def allow(self, source: str) -> bool:
+        """Можно ли запускать источник сейчас"""
+        return time.time() >= self._source(source).get("open_until", 0.0)
+
+    def record_success(self, source: str):
+        entry = self._source(source)
+        entry.update(failures=0, open_until=0.0, last_success=time.time())
+        entry.pop("last_error", None)
+
+    def record_failure(self, source: str, error: str):
+        entry = self._source(source)
+        entry["failures"] = entry.get("failures", 0) + 1
+        entry["last_error"] = error
+        if entry["failures"] >= settings.BREAKER_FAILURE_THRESHOLD:
+            entry["open_until"] = time.time() + settings.BREAKER_COOLDOWN_S
+            print(f"Circuit breaker: {source} skipped for {settings.BREAKER_COOLDOWN_S:g}s "
+                  f"after {entry['failures']} failures")
+
+    def save(self):
+        if self._data is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Circuit breaker: failed to save {self.path}: {e}")
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.time()
+        return {
+            source: {**entry, "open": now < entry.get("open_until", 0.0)}
+            for source, entry in self._load().items()
+        }
+
+circuit_breaker = CircuitBreaker(settings.BREAKER_PATH)
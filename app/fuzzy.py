@@ -0,0 +1,226 @@
+import csv
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from .settings import settings
+
+def trigrams(key: str) -> Set[str]:
+    """Символьные триграммы нормализованного названия (с пробелами по краям)"""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Слова, которые не отличают одну команду от другой
+QUALIFIERS = {"the", "of", "university", "college"}
+
+def tokens(key: str) -> List[str]:
+    """Значимые слова нормализованного названия"""
+    return [t for t in _TOKEN.findall(key) if t not in QUALIFIERS]
+
+def one_typo(a: str, b: str) -> bool:
+    """Слова отличаются одной опечаткой: вставка, удаление, замена или перестановка соседних букв
+
+    Короткие слова (меньше 4 букв) должны совпадать точно.
+    """
+    if min(len(a), len(b)) < 4 or abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    return a[i:] == b[i + 1:]
+
+def tokens_agree(key: str, alias: str) -> bool:
+    """Каждому слову названия соответствует свое слово алиаса (совпадение или одна опечатка)
+
+    Общие триграммы есть и у разных команд: Arkansas State / Kansas State,
+    UC San Diego / San Diego, Tennessee Tech / Tennessee. Лишнее или другое
+    слово означает другую команду.
+    """
+    left, right = tokens(key), tokens(alias)
+    if len(left) != len(right):
+        return False
+    unused = list(right)
+    for token in left:
+        if token in unused:
+            unused.remove(token)
+            continue
+        best = next((t for t in unused if one_typo(token, t)), None)
+        if best is None:
+            return False
+        unused.remove(best)
+    return True
+
+class FuzzyMatcher:
+    """Нечеткий поиск по словарю алиасов через инвертированный индекс триграмм
+
+    Индекс строится один раз на словарь: триграмма -> номера алиасов.
+    Кандидаты - только алиасы с общими триграммами, сходство - коэффициент Дайса.
+    Кандидат принимается, только если совпадают и слова (tokens_agree).
+    Название, совпавшее с алиасом после отбрасывания QUALIFIERS, берется сразу.
+    """
+
+    def __init__(self, alias_map: Dict[str, str], threshold: float, margin: float):
+        self.threshold = threshold
+        self.margin = margin
+        self.aliases: List[str] = list(alias_map)
+        self.canonical: List[str] = [alias_map[alias] for alias in self.aliases]
+        self.sizes: List[int] = []
+        self.index: Dict[str, List[int]] = defaultdict(list)
+        self.stripped: Dict[str, Dict[str, str]] = defaultdict(dict)
+        for i, alias in enumerate(self.aliases):
+            self.stripped[" ".join(tokens(alias))].setdefault(self.canonical[i], alias)
+            grams = trigrams(alias)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.index[gram].append(i)
+        self._misses: Set[str] = set()
+
+    def match(self, key: str) -> Optional[Tuple[str, str, float]]:
+        """(каноническое название, алиас, сходство) или None, если уверенности нет"""
+        if not key or key in self._misses:
+            return None
+        exact = self.stripped.get(" ".join(tokens(key)))
+        if exact and len(exact) == 1:
+            canonical, alias = next(iter(exact.items()))
+            return canonical, alias, 1.0
+        grams = trigrams(key)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for i in self.index.get(gram, ()):
+                shared[i] += 1
+
+        # Лучший алиас для каждого канонического названия
+        best: Dict[str, Tuple[float, str]] = {}
+        for i, count in shared.items():
+            score = 2 * count / (len(grams) + self.sizes[i])
+            if score < self.threshold or not tokens_agree(key, self.aliases[i]):
+                continue
+            canonical = self.canonical[i]
+            if score > best.get(canonical, (0.0, ""))[0]:
+                best[canonical] = (score, self.aliases[i])
+
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)
+        if not ranked or ranked[0][1][0] < self.threshold:
+            self._misses.add(key)
+            return None
+        # Две разные команды почти одинаково похожи - не угадываем
+        if len(ranked) > 1 and ranked[0][1][0] - ranked[1][1][0] < self.margin:
+            self._misses.add(key)
+            return None
+        canonical, (score, alias) = ranked[0]
+        return canonical, alias, score
+
+_matcher: Optional[Tuple[Dict[str, str], FuzzyMatcher]] = None
+
+def get_matcher(alias_map: Dict[str, str]) -> FuzzyMatcher:
+    """Матчер для словаря; индекс перестраивается только для нового словаря"""
+    global _matcher
+    if _matcher is None or _matcher[0] is not alias_map:
+        _matcher = (alias_map, FuzzyMatcher(alias_map, settings.FUZZY_MATCH_THRESHOLD, settings.FUZZY_MATCH_MARGIN))
+    return _matcher[1]
+
+class LearnedAliases:
+    """Алиасы, найденные нечетким поиском, - очередь на проверку
+
+    Дописываются в CSV (alias, canonical, score, source, raw, approved) с пустым
+    approved. В точный поиск при загрузке словаря попадают только строки,
+    где человек поставил approved = 1; остальные лишь используются в текущем
+    процессе. Спасенные строки по источникам и названиям копятся в report()
+    до reset_report().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._known: Dict[str, str] = {}
+        self._pending: List[dict] = []
+        self._recovered: Dict[Tuple[str, str], dict] = {}
+
+    def _read(self) -> Tuple[List[str], List[dict]]:
+        """Заголовок и строки файла"""
+        try:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                reader = csv.DictReader(f)
+                rows = [row for row in reader if row.get("alias") and row.get("canonical")]
+                return list(reader.fieldnames or []), rows
+        except OSError:
+            return [], []
+
+    def _rows(self) -> List[dict]:
+        return self._read()[1]
+
+    def load(self) -> Dict[str, str]:
+        """Проверенные алиасы: нормализованный алиас -> каноническое название"""
+        return {row["alias"]: row["canonical"] for row in self._rows()
+                if (row.get("approved") or "").strip().lower() in ("1", "yes", "true")}
+
+    def mtime(self) -> Optional[float]:
+        """Время изменения файла (None - файла нет)"""
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Каноническое название для алиаса, выученного в этом процессе"""
+        return self._known.get(key)
+
+    def learn(self, source: Optional[str], raw: str, key: str, canonical: str, alias: str, score: float):
+        self._known[key] = canonical
+        self._pending.append({
+            "alias": key,
+            "canonical": canonical,
+            "score": round(score, 3),
+            "source": source or "",
+            "raw": raw,
+        })
+        print(f"Fuzzy match ({source}): {raw!r} -> {canonical} via {alias!r}, score {score:.2f}")
+
+    def count(self, source: Optional[str], raw: str, key: str, canonical: str):
+        """Учет строки, сопоставленной через выученный алиас"""
+        entry = self._recovered.setdefault((source or "", key), {
+            "source": source or "",
+            "raw": raw,
+            "canonical": canonical,
+            "rows": 0,
+        })
+        entry["rows"] += 1
+
+    def save(self):
+        """Новые совпадения - в очередь на проверку (уже стоящие в очереди не повторяем)"""
+        if not self._pending:
+            return
+        header, rows = self._read()
+        queued = {row["alias"] for row in rows}
+        pending = [{**entry, "approved": ""} for entry in self._pending if entry["alias"] not in queued]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fields = ["alias", "canonical", "score", "source", "raw", "approved"]
+        try:
+            # Файл старого формата (без approved) переписываем целиком: его строки тоже ждут проверки
+            rewrite = bool(header) and "approved" not in header
+            if rewrite:
+                pending = [{field: row.get(field) or "" for field in fields} for row in rows] + pending
+            new_file = rewrite or not os.path.exists(self.path)
+            with open(self.path, "w" if rewrite else "a", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(pending)
+            self._pending = []
+        except OSError as e:
+            print(f"Learned aliases: failed to save {self.path}: {e}")
+
+    def reset_report(self):
+        self._recovered = {}
+
+    def report(self) -> List[dict]:
+        """Названия, спасенные нечетким поиском, и число строк по каждому"""
+        return sorted(self._recovered.values(), key=lambda e: (e["source"], e["raw"]))
+
+learned_aliases = LearnedAliases(settings.LEARNED_ALIASES_PATH)
@@ -0,0 +1,188 @@
+import math
+import os
+import re
+import struct
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple, get_args
+from .models import Source, SourceMetrics
+from .merger import flip_metrics, pair_key
+from .settings import settings
+
+SOURCES: List[str] = list(get_args(Source))
+METRICS: List[str] = list(SourceMetrics.model_fields)
+
+# Запись фиксированной длины: время съемки, номер игры, номер источника, метрики (NaN - нет значения)
+RECORD = struct.Struct("<dIB" + "d" * len(METRICS))
+INT_METRICS = {name for name, field in SourceMetrics.model_fields.items() if field.annotation == Optional[int]}
+
+_ET_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def valid_et_date(value: str) -> bool:
+    """Дата строго в виде YYYY-MM-DD (она же - имя файла, поэтому без путей)"""
+    if not _ET_DATE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+def game_pair(key: str) -> Optional[Tuple[str, str]]:
+    """(пара команд за день, хозяева) для game_key вида date|home|away|neutral[#n]
+
+    Пара не зависит от того, кто хозяин, и от нейтрального поля: при смене
+    ориентации игры в merger ее история не теряется. Суффикс #n (вторая игра
+    пары за день) сохраняется.
+    """
+    key, sep, seq = key.partition("#")
+    parts = key.split("|")
+    if len(parts) != 4:
+        return None
+    d, home, away, _ = parts
+    return pair_key(d, home, away) + sep + seq, home
+
+class LineStore:
+    """Append-only хранилище истории линий по дням
+
+    На каждый день ET два файла:
+      <date>.bin  - записи RECORD подряд, только дописываются;
+      <date>.keys - game_key по строке, номер строки = номер игры в записях.
+
+    Метрики записаны в ориентации своего game_key. Чтение идет по паре команд
+    (game_pair): записи под ключом с другими хозяевами разворачиваются.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._keys: Dict[str, List[str]] = {}
+        self._key_index: Dict[str, Dict[str, int]] = {}
+        self._keys_size: Dict[str, int] = {}
+
+    def _path(self, et_date: str, ext: str) -> str:
+        if not valid_et_date(et_date):
+            raise ValueError(f"Invalid ET date: {et_date!r}")
+        return os.path.join(self.directory, f"{et_date}.{ext}")
+
+    def _load_keys(self, et_date: str) -> Dict[str, int]:
+        path = self._path(et_date, "keys")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        # Перечитываем, если файл ключей дописал другой процесс
+        if et_date not in self._key_index or self._keys_size.get(et_date) != size:
+            keys = []
+            if size:
+                with open(path, "r", encoding="utf-8") as f:
+                    keys = [line.rstrip("\n") for line in f if line.strip()]
+            self._keys[et_date] = keys
+            self._key_index[et_date] = {key: i for i, key in enumerate(keys)}
+            self._keys_size[et_date] = size
+        return self._key_index[et_date]
+
+    def append(self, et_date: str, observations: Iterable[Tuple[str, str, SourceMetrics]],
+               captured_at: Optional[float] = None) -> int:
+        """Дописать наблюдения (game_key, источник, метрики), возвращает число записей"""
+        captured_at = captured_at if captured_at is not None else time.time()
+        index = self._load_keys(et_date)
+        new_keys = []
+        chunks = []
+
+        for key, source, metrics in observations:
+            game_idx = index.get(key)
+            if game_idx is None:
+                game_idx = index[key] = len(self._keys[et_date])
+                self._keys[et_date].append(key)
+                new_keys.append(key)
+            values = [getattr(metrics, name) for name in METRICS]
+            chunks.append(RECORD.pack(
+                captured_at,
+                game_idx,
+                SOURCES.index(source),
+                *(math.nan if v is None else float(v) for v in values)
+            ))
+
+        if not chunks:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        # Ключи пишем раньше записей, чтобы запись никогда не ссылалась на неизвестную игру
+        if new_keys:
+            with open(self._path(et_date, "keys"), "a", encoding="utf-8") as f:
+                f.write("".join(key + "\n" for key in new_keys))
+            self._keys_size[et_date] = os.path.getsize(self._path(et_date, "keys"))
+        with open(self._path(et_date, "bin"), "ab") as f:
+            f.write(b"".join(chunks))
+        return len(chunks)
+
+    def _records(self, et_date: str):
+        try:
+            with open(self._path(et_date, "bin"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Недописанный хвост (запись прервалась) пропускаем
+        usable = len(data) - len(data) % RECORD.size
+        yield from RECORD.iter_unpack(memoryview(data)[:usable])
+
+    @staticmethod
+    def _metrics(values) -> dict:
+        out = {}
+        for name, v in zip(METRICS, values):
+            if math.isnan(v):
+                out[name] = None
+            elif name in INT_METRICS:
+                out[name] = int(v)
+            else:
+                out[name] = v
+        return out
+
+    def _pairs(self, et_date: str) -> List[Optional[Tuple[str, str]]]:
+        """game_pair для каждого номера игры дня"""
+        self._load_keys(et_date)
+        return [game_pair(key) for key in self._keys[et_date]]
+
+    def history(self, key: str) -> List[dict]:
+        """Все наблюдения по игре в порядке съемки, в ориентации key"""
+        wanted = game_pair(key)
+        if wanted is None:
+            return []
+        pair, home = wanted
+        et_date = key.split("|", 1)[0]
+        # Номер игры -> разворачивать ли ее записи
+        games = {idx: game[1] != home for idx, game in enumerate(self._pairs(et_date))
+                 if game is not None and game[0] == pair}
+        if not games:
+            return []
+        return [
+            {"capturedAt": ts, "source": SOURCES[source_idx],
+             **self._metrics(flip_metrics(values) if games[idx] else values)}
+            for ts, idx, source_idx, *values in self._records(et_date)
+            if idx in games
+        ]
+
+    def as_of(self, et_date: str, at: float) -> Dict[str, Dict[str, dict]]:
+        """Последние метрики каждой игры по каждому источнику на момент at
+
+        Игра - под game_key своей последней записи, метрики всех источников - в его ориентации.
+        """
+        pairs = self._pairs(et_date)
+        latest: Dict[Tuple[str, int], tuple] = {}
+        newest: Dict[str, Tuple[float, int]] = {}
+        for ts, idx, source_idx, *values in self._records(et_date):
+            if ts > at or idx >= len(pairs) or pairs[idx] is None:
+                continue
+            pair = pairs[idx][0]
+            # Записи идут в порядке съемки, более поздняя перезаписывает
+            latest[(pair, source_idx)] = (ts, idx, values)
+            newest[pair] = (ts, idx)
+
+        keys = self._keys[et_date]
+        out: Dict[str, Dict[str, dict]] = {}
+        for (pair, source_idx), (ts, idx, values) in latest.items():
+            game_idx = newest[pair][1]
+            if pairs[idx][1] != pairs[game_idx][1]:
+                values = flip_metrics(values)
+            out.setdefault(keys[game_idx], {})[SOURCES[source_idx]] = {
+                "capturedAt": ts, **self._metrics(values)
+            }
+        return out
+
+line_store = LineStore(settings.LINES_DIR)
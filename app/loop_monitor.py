@@ -0,0 +1,52 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+class LoopLagMonitor:
+    """Замер времени, на которое блокируется event loop
+
+    Фоновая задача спит interval секунд; все, что сверх interval,
+    loop был занят синхронным кодом и не обслуживал другие корутины.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.01):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked_s = 0.0
+        self.max_lag_s = 0.0
+        self._tick = time.monotonic()
+
+    def _account(self):
+        lag = time.monotonic() - self._tick - self.interval
+        if lag > self.threshold:
+            self.blocked_s += lag
+            self.max_lag_s = max(self.max_lag_s, lag)
+
+    async def _sample(self):
+        while True:
+            self._tick = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._account()
+
+    @asynccontextmanager
+    async def measure(self):
+        """Замер на время блока async with"""
+        self.blocked_s = 0.0
+        self.max_lag_s = 0.0
+        task = asyncio.create_task(self._sample())
+        await asyncio.sleep(0)  # даем задаче замера стартовать
+        try:
+            yield self
+        finally:
+            task.cancel()
+            # Учитываем блокировку, которую задача замера не успела увидеть
+            self._account()
+
+    def stats(self) -> dict:
+        return {
+            "blocked_s": round(self.blocked_s, 3),
+            "max_lag_s": round(self.max_lag_s, 3),
+        }
+
+# Замер последнего сбора данных
+ingest_loop_monitor = LoopLagMonitor()
@@ -4,11 +4,26 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from .scheduler import start_scheduler
+import time
+import pydantic_core
+from datetime import datetime
+from typing import Optional
+from .scheduler import start_scheduler, ET
 from .storage import load_snapshot
+from .payloads import PayloadCache
+from .s3 import start_s3_client, close_s3_client
 from .settings import settings
-from .tasks import ingest_today
+from .tasks import ingest_today, last_reconciliations
 from .formatting import get_spread_class, get_total_class, get_winprob_class
+from .scrapers.ratelimit import rate_limiter
+from .scrapers.pool import start_client_pool, close_client_pool
+from .scrapers.httpcache import http_cache
+from .scrapers.parsing import shutdown_executor
+from .loop_monitor import ingest_loop_monitor
+from .breaker import circuit_breaker
+from .fuzzy import learned_aliases
+from .lines import line_store, valid_et_date
+from . import sqlite_store
 
 # Create FastAPI application
 app = FastAPI(
@@ -37,6 +52,8 @@ templates = Jinja2Templates(directory="app/templates")
 async def startup_event():
     """Application startup initialization"""
     print("Starting NCAA D1 Predictor...")
+    await start_client_pool()
+    await start_s3_client()
     start_scheduler()
     print("Application started successfully!")
 
@@ -44,20 +61,30 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on application shutdown"""
     print("Shutting down NCAA D1 Predictor...")
+    await close_client_pool()
+    await close_s3_client()
+    shutdown_executor()
 
 # Main page
+def _render_home(snap) -> bytes:
+    """Rendered index.html for a snapshot (the template does not use the request)"""
+    return templates.get_template("index.html").render(
+        snap=snap,
+        get_spread_class=get_spread_class,
+        get_total_class=get_total_class,
+        get_winprob_class=get_winprob_class
+    ).encode("utf-8")
+
+# Rendered and compressed once per snapshot version
+home_page_payload = PayloadCache(_render_home, "text/html; charset=utf-8")
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Main page with predictions table"""
     try:
         snap = await load_snapshot()
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "snap": snap,
-            "get_spread_class": get_spread_class,
-            "get_total_class": get_total_class,
-            "get_winprob_class": get_winprob_class
-        })
+        payload = await home_page_payload.get(snap)
+        return payload.response(request)
     except Exception as e:
         print(f"Error loading snapshot: {e}")
         return templates.TemplateResponse("index.html", {
@@ -80,19 +107,27 @@ async def manual_refresh(token: str):
         raise HTTPException(status_code=500, detail=f"Refresh failed: {str(e)}")
 
 # API to get data in JSON format
+def _api_data_body(snap) -> bytes:
+    """JSON body of /api/data for a snapshot"""
+    return pydantic_core.to_json({
+        "status": snap.status,
+        "date": snap.etDate,
+        "games": snap.rows
+    })
+
+# Serialized and compressed once per snapshot version
+api_data_payload = PayloadCache(_api_data_body, "application/json")
+
 @app.get("/api/data")
-async def get_data():
-    """API endpoint to get data in JSON format"""
+async def get_data(request: Request):
+    """API endpoint to get data in JSON format (ETag / If-None-Match, gzip and brotli)"""
     try:
         snap = await load_snapshot()
         if not snap:
             raise HTTPException(status_code=404, detail="No data available")
         
-        return {
-            "status": snap.status,
-            "date": snap.etDate,
-            "games": [game.model_dump() for game in snap.rows]
-        }
+        payload = await api_data_payload.get(snap)
+        return payload.response(request)
     except Exception as e:
         print(f"API data error: {e}")
         raise HTTPException(status_code=500, detail=f"Error loading data: {str(e)}")
@@ -150,6 +185,61 @@ async def get_stats():
         print(f"Stats error: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating stats: {str(e)}")
 
+# Line movement history for one game
+@app.get("/api/lines/history")
+async def get_line_history(key: str):
+    """All captured observations for a game (key = merger game_key: date|home|away|neutral), oriented to its home team"""
+    if not valid_et_date(key.split("|", 1)[0]):
+        raise HTTPException(status_code=400, detail="Invalid game key date, expected YYYY-MM-DD")
+    observations = line_store.history(key)
+    if not observations:
+        raise HTTPException(status_code=404, detail="No line history for this game")
+    return {"key": key, "observations": observations}
+
+# Lines snapshot as of a point in time
+@app.get("/api/lines/asof")
+async def get_lines_as_of(date: str, at: Optional[str] = None):
+    """Latest metrics per game and source captured at or before `at` (ISO datetime, ET if no offset; default now)"""
+    if not valid_et_date(date):
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+    try:
+        at_dt = datetime.fromisoformat(at) if at else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'at' datetime")
+    if at_dt is not None and at_dt.tzinfo is None:
+        at_dt = ET.localize(at_dt)
+    at_ts = at_dt.timestamp() if at_dt else time.time()
+    return {"date": date, "at": at_ts, "games": line_store.as_of(date, at_ts)}
+
+# Historical games from the SQLite snapshot store
+@app.get("/api/history")
+async def get_history(date_from: str, date_to: Optional[str] = None,
+                      team: Optional[str] = None, source: Optional[str] = None):
+    """Games between date_from and date_to (YYYY-MM-DD), optionally filtered by team and source"""
+    try:
+        rows = await sqlite_store.query_games(date_from, date_to or date_from, team, source)
+    except Exception as e:
+        print(f"History query error: {e}")
+        raise HTTPException(status_code=500, detail=f"Error querying history: {str(e)}")
+    return {
+        "from": date_from,
+        "to": date_to or date_from,
+        "games": [game.model_dump() for game in rows]
+    }
+
+# Scraper statistics endpoint
+@app.get("/api/scraper-stats")
+async def get_scraper_stats():
+    """Scraper runtime statistics (for tuning politeness vs ingest latency)"""
+    return {
+        "throttle_seconds_by_host": rate_limiter.stats(),
+        "http_cache_by_source": http_cache.stats(),
+        "last_ingest_loop_block": ingest_loop_monitor.stats(),
+        "circuit_breakers": circuit_breaker.stats(),
+        "last_ingest_fuzzy_matches": learned_aliases.report(),
+        "last_ingest_reconciliations": last_reconciliations
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
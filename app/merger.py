@@ -1,56 +1,285 @@
 from datetime import date
-from typing import List, Dict
-from .models import PredictorRow, SourceMetrics
-from statistics import mean
+from typing import Iterable, List, Dict, Optional, get_args
+from .models import PredictorRow, Source, SourceMetrics
+from .settings import settings
+import numpy as np
 
 def game_key(d: str, home: str, away: str, neutral: bool) -> str:
     """Создание уникального ключа для игры"""
     return f"{d}|{home}|{away}|{int(neutral)}"
 
-def attach(rows: Dict[str, PredictorRow], dISO: str, tipoff: str, neutral: bool, 
+# Все источники снимка и поля SourceMetrics в порядке хранения в кортежах
+SOURCES: List[str] = list(get_args(Source))
+METRIC_FIELDS: List[str] = list(SourceMetrics.model_fields)
+INT_FIELDS = {name for name, field in SourceMetrics.model_fields.items() if field.annotation == Optional[int]}
+METRIC_INDEX = {name: i for i, name in enumerate(METRIC_FIELDS)}
+# Приоритет источников при расхождении в ориентации игры (меньше - главнее)
+SOURCE_RANK = {source: i for i, source in enumerate(SOURCES)}
+# Перестановка полей при смене хозяев и гостей местами
+FLIP_INDEX = [METRIC_INDEX[{"projHome": "projAway", "projAway": "projHome",
+                            "moneylineHome": "moneylineAway", "moneylineAway": "moneylineHome"}.get(name, name)]
+              for name in METRIC_FIELDS]
+
+class GameRecord:
+    """Легкая запись игры на время сборки снимка
+
+    Метрики источника - кортеж в порядке METRIC_FIELDS (None - источника нет).
+    В PredictorRow превращается только в finalize, при публикации.
+    """
+    __slots__ = ("dateISO", "tipoffET", "neutral", "awayTeam", "homeTeam", "rank", *SOURCES)
+
+    def __init__(self, dateISO: str, tipoffET: Optional[str], neutral: bool, awayTeam: str, homeTeam: str,
+                 rank: int = -1):
+        self.dateISO = dateISO
+        self.tipoffET = tipoffET
+        self.neutral = neutral
+        self.awayTeam = awayTeam
+        self.homeTeam = homeTeam
+        # Приоритет источника, задавшего ориентацию (-1 - опубликованная строка, ее не меняем)
+        self.rank = rank
+        for source in SOURCES:
+            setattr(self, source, None)
+
+    @property
+    def key(self) -> str:
+        return game_key(self.dateISO, self.homeTeam, self.awayTeam, self.neutral)
+
+    @classmethod
+    def from_row(cls, pr: PredictorRow) -> "GameRecord":
+        """Запись из опубликованной строки (для обновления сохраненного снимка)"""
+        rec = cls(pr.dateISO, pr.tipoffET, pr.neutral, pr.awayTeam, pr.homeTeam)
+        for source in SOURCES:
+            metrics = getattr(pr, source)
+            if metrics is not None:
+                setattr(rec, source, tuple(getattr(metrics, name) for name in METRIC_FIELDS))
+        return rec
+
+def metrics_tuple(metrics: dict) -> tuple:
+    """Метрики источника в кортеж METRIC_FIELDS с приведением типов, как в SourceMetrics"""
+    out = []
+    for name in METRIC_FIELDS:
+        value = metrics.get(name)
+        if value is not None:
+            value = int(value) if name in INT_FIELDS else float(value)
+        out.append(value)
+    return tuple(out)
+
+def flip_metrics(values: tuple) -> tuple:
+    """Метрики с точки зрения другой команды: знак форы, 1 - p, обмен проекций и мани-лайнов"""
+    flipped = [values[i] for i in FLIP_INDEX]
+    spread, win_prob = METRIC_INDEX["spread"], METRIC_INDEX["winProbHome"]
+    if flipped[spread] is not None:
+        flipped[spread] = -flipped[spread]
+    if flipped[win_prob] is not None:
+        # Округление убирает хвосты вроде 1 - 0.7 = 0.30000000000000004
+        flipped[win_prob] = round(1.0 - flipped[win_prob], 10)
+    return tuple(flipped)
+
+def pair_key(d: str, team_a: str, team_b: str) -> str:
+    """Ключ игры без учета того, кто хозяин"""
+    return f"{d}|{min(team_a, team_b)}|{max(team_a, team_b)}"
+
+def unique_key(key: str, taken) -> str:
+    """Ключ, еще не занятый в taken: вторая игра пары за день получает суффикс #2, третья #3"""
+    if key not in taken:
+        return key
+    n = 2
+    while f"{key}#{n}" in taken:
+        n += 1
+    return f"{key}#{n}"
+
+def row_keys(rows: Iterable[PredictorRow]) -> List[str]:
+    """Ключи опубликованных строк в том же виде, что дает GameIndex"""
+    keys: Dict[str, None] = {}
+    for row in rows:
+        keys[unique_key(game_key(row.dateISO, row.homeTeam, row.awayTeam, row.neutral), keys)] = None
+    return list(keys)
+
+class GameIndex(dict):
+    """game_key -> GameRecord с индексом по дате и неупорядоченной паре команд
+
+    Один и тот же матч от разных источников находится за O(1), даже если
+    источник поменял хозяев и гостей местами или иначе указал нейтральное поле.
+    Все такие согласования копятся в reconciliations.
+    """
+
+    def __init__(self, records: Optional[Dict[str, GameRecord]] = None):
+        super().__init__()
+        self._pairs: Dict[str, List[str]] = {}
+        self.reconciliations: List[dict] = []
+        for rec in (records or {}).values():
+            self.add(rec)
+
+    def add(self, rec: GameRecord) -> str:
+        # game_key не содержит времени: вторая игра с теми же хозяевами получает свой ключ
+        key = unique_key(rec.key, self)
+        self._pairs.setdefault(pair_key(rec.dateISO, rec.homeTeam, rec.awayTeam), []).append(key)
+        self[key] = rec
+        return key
+
+    def _remove(self, key: str):
+        rec = self.pop(key)
+        self._pairs[pair_key(rec.dateISO, rec.homeTeam, rec.awayTeam)].remove(key)
+
+    def find(self, dISO: str, home: str, away: str, tipoff: Optional[str], source: str) -> Optional[str]:
+        """Ключ уже известной игры этой пары команд в эту дату"""
+        keys = self._pairs.get(pair_key(dISO, home, away))
+        if not keys:
+            return None
+        # Время начала - для пары, сыгравшей в один день дважды
+        if tipoff:
+            for key in keys:
+                if self[key].tipoffET == tipoff:
+                    return key
+        for key in keys:
+            # Источник уже дал данные по этой игре, а время другое или неизвестно - значит, это другая игра
+            if getattr(self[key], source) is None:
+                return key
+        return None
+
+    def clear_source(self, source: str):
+        """Убрать данные источника; записи, где больше ничего нет, удаляются"""
+        for key, rec in list(self.items()):
+            if getattr(rec, source) is None:
+                continue
+            setattr(rec, source, None)
+            if all(getattr(rec, s) is None for s in SOURCES):
+                self._remove(key)
+
+    def reorient(self, key: str, flip: bool, neutral: bool) -> str:
+        """Смена ориентации записи (хозяева/гости, нейтральное поле), возвращает новый ключ"""
+        rec = self[key]
+        self._remove(key)
+        if flip:
+            rec.homeTeam, rec.awayTeam = rec.awayTeam, rec.homeTeam
+            for source in SOURCES:
+                values = getattr(rec, source)
+                if values is not None:
+                    setattr(rec, source, flip_metrics(values))
+        rec.neutral = neutral
+        return self.add(rec)
+
+def attach(rows: GameIndex, dISO: str, tipoff: str, neutral: bool, 
            home: str, away: str, source: str, metrics: dict):
     """Прикрепление метрик источника к игре"""
-    key = game_key(dISO, home, away, neutral)
-    pr = rows.get(key)
+    values = metrics_tuple(metrics)
+    rank = SOURCE_RANK[source]
+    key = rows.find(dISO, home, away, tipoff, source)
+    
+    if key is None:
+        rec = GameRecord(dISO, tipoff, neutral, away, home, rank)
+        rows.add(rec)
+        setattr(rec, source, values)
+        return
     
-    if not pr:
-        pr = PredictorRow(
-            dateISO=dISO,
-            tipoffET=tipoff,
-            neutral=neutral,
-            homeTeam=home,
-            awayTeam=away
-        )
-        rows[key] = pr
+    rec = rows[key]
+    flipped = rec.homeTeam != home
+    neutral_mismatch = rec.neutral != neutral
+    if flipped or neutral_mismatch:
+        # Ориентацию записи задает самый приоритетный источник
+        reoriented = rank < rec.rank
+        if reoriented:
+            key = rows.reorient(key, flipped, neutral)
+            rec.rank = rank
+        rows.reconciliations.append({
+            "source": source,
+            "game": key,
+            "reported": game_key(dISO, home, away, neutral),
+            "flipped": flipped,
+            "neutralMismatch": neutral_mismatch,
+            "reoriented": reoriented,
+        })
+        if reoriented:
+            flipped = False
     
-    # Устанавливаем метрики для источника
-    setattr(pr, source, SourceMetrics(**metrics))
+    # Устанавливаем метрики для источника (в ориентации записи)
+    setattr(rec, source, flip_metrics(values) if flipped else values)
 
-def finalize(rows: Dict[str, PredictorRow]) -> List[PredictorRow]:
-    """Финализация данных - вычисление средних значений"""
-    out = []
+# Источники, по которым считается консенсус (линии букмекеров не участвуют)
+CONSENSUS_SOURCES = ["kenpom", "bart", "massey", "hasla"]
+# Метрика SourceMetrics -> суффикс полей консенсуса в PredictorRow
+CONSENSUS_METRICS = {"spread": "Spread", "total": "Total", "winProbHome": "WinProbHome"}
+CONSENSUS_STATS = ["avg", "median", "stdev", "min", "max", "weighted"]
+# Все поля PredictorRow, которые заполняет finalize
+CONSENSUS_FIELDS = [f"{stat}{suffix}" for suffix in CONSENSUS_METRICS.values() for stat in CONSENSUS_STATS] + ["sourceCount"]
+
+def game_table(records: List[GameRecord]) -> Dict[str, np.ndarray]:
+    """Колоночная таблица игр: метрика -> массив (игры x источники), NaN - нет значения"""
+    table = {}
+    for metric in CONSENSUS_METRICS:
+        idx = METRIC_INDEX[metric]
+        # None превращается в NaN при сборке float-массива
+        table[metric] = np.array([
+            [m[idx] if m is not None else None for m in (getattr(rec, s) for s in CONSENSUS_SOURCES)]
+            for rec in records
+        ], dtype=float).reshape(len(records), len(CONSENSUS_SOURCES))
+    return table
+
+def consensus(values: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """Статистики по источникам для всех игр за один проход (NaN - мало данных)"""
+    mask = ~np.isnan(values)
+    count = mask.sum(axis=1)
+    filled = np.where(mask, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=1) / count
+        # Выборочное стандартное отклонение, как statistics.stdev: нужно минимум два значения
+        sq = np.where(mask, (values - mean[:, None]) ** 2, 0.0).sum(axis=1)
+        stdev = np.where(count > 1, np.sqrt(sq / (count - 1)), np.nan)
+        w = np.where(mask, weights, 0.0)
+        weighted = (filled * w).sum(axis=1) / w.sum(axis=1)
+    empty = count == 0
+    # Медиана: NaN уходят в конец сортировки, берем середину из count значений
+    ordered = np.sort(values, axis=1)
+    rows = np.arange(len(values))
+    lo = ordered[rows, np.maximum((count - 1) // 2, 0)]
+    hi = ordered[rows, np.maximum(count // 2, 0)]
+    return {
+        "avg": mean,
+        "median": np.where(empty, np.nan, (lo + hi) / 2),
+        "stdev": stdev,
+        "min": np.where(empty, np.nan, np.where(mask, values, np.inf).min(axis=1)),
+        "max": np.where(empty, np.nan, np.where(mask, values, -np.inf).max(axis=1)),
+        "weighted": weighted,
+    }
+
+def source_weights() -> np.ndarray:
+    """Веса источников из CONSENSUS_WEIGHTS (по умолчанию 1)"""
+    return np.array([settings.CONSENSUS_WEIGHTS.get(s, 1.0) for s in CONSENSUS_SOURCES], dtype=float)
+
+def _publish(rec: GameRecord, stats: Dict) -> PredictorRow:
+    """PredictorRow из записи: одна валидация всей строки при публикации"""
+    data = {
+        "dateISO": rec.dateISO,
+        "tipoffET": rec.tipoffET,
+        "neutral": rec.neutral,
+        "awayTeam": rec.awayTeam,
+        "homeTeam": rec.homeTeam,
+        **stats,
+    }
+    for source in SOURCES:
+        m = getattr(rec, source)
+        if m is not None:
+            data[source] = dict(zip(METRIC_FIELDS, m))
+    # model_validate из словарей в pydantic v2 быстрее model_construct
+    return PredictorRow.model_validate(data)
+
+def finalize(rows: Dict[str, GameRecord]) -> List[PredictorRow]:
+    """Финализация данных - консенсус источников для всех игр разом и публикация строк"""
+    records = list(rows.values())
+    if not records:
+        return []
     
-    for pr in rows.values():
-        # Собираем все доступные значения для вычисления средних
-        spreads = []
-        totals = []
-        win_probs = []
-        
-        for source in ["kenpom", "bart", "massey", "hasla"]:
-            metrics = getattr(pr, source)
-            if metrics:
-                if metrics.spread is not None:
-                    spreads.append(metrics.spread)
-                if metrics.total is not None:
-                    totals.append(metrics.total)
-                if metrics.winProbHome is not None:
-                    win_probs.append(metrics.winProbHome)
-        
-        # Вычисляем средние значения
-        pr.avgSpread = mean(spreads) if spreads else None
-        pr.avgTotal = mean(totals) if totals else None
-        pr.avgWinProbHome = mean(win_probs) if win_probs else None
-        
-        out.append(pr)
+    table = game_table(records)
+    weights = source_weights()
+    columns = {}
+    # Источник считается, если дал хотя бы одну из метрик
+    has_any = np.zeros((len(records), len(CONSENSUS_SOURCES)), dtype=bool)
+    for metric, suffix in CONSENSUS_METRICS.items():
+        has_any |= ~np.isnan(table[metric])
+        for stat, values in consensus(table[metric], weights).items():
+            # NaN -> None; tolist() сразу дает питоновские float
+            columns[f"{stat}{suffix}"] = [None if v != v else v for v in values.tolist()]
+    columns["sourceCount"] = has_any.sum(axis=1).tolist()
     
-    return out
+    fields = list(columns)
+    return [_publish(rec, dict(zip(fields, values))) for rec, values in zip(records, zip(*columns.values()))]
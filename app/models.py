@@ -26,8 +26,27 @@ class PredictorRow(BaseModel):
     avgSpread: Optional[float] = None
     avgTotal: Optional[float] = None
     avgWinProbHome: Optional[float] = None
+    # Консенсус источников (см. merger.finalize): медиана, разброс, крайние значения,
+    # среднее с весами CONSENSUS_WEIGHTS и число источников с данными
+    medianSpread: Optional[float] = None
+    stdevSpread: Optional[float] = None
+    minSpread: Optional[float] = None
+    maxSpread: Optional[float] = None
+    weightedSpread: Optional[float] = None
+    medianTotal: Optional[float] = None
+    stdevTotal: Optional[float] = None
+    minTotal: Optional[float] = None
+    maxTotal: Optional[float] = None
+    weightedTotal: Optional[float] = None
+    medianWinProbHome: Optional[float] = None
+    stdevWinProbHome: Optional[float] = None
+    minWinProbHome: Optional[float] = None
+    maxWinProbHome: Optional[float] = None
+    weightedWinProbHome: Optional[float] = None
+    sourceCount: int = 0
 
 class Snapshot(BaseModel):
     status: Literal["ok", "stale"] = "ok"
     etDate: str                 # YYYY-MM-DD (ET)
     rows: List[PredictorRow] = []
+    staleSources: List[Source] = []  # источники с последними успешными данными вместо свежих
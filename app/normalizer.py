@@ -1,36 +1,64 @@
 import csv
+import hashlib
 import io
+import json
+import os
 import re
-import httpx
+import time
+from functools import lru_cache
 from unidecode import unidecode
-from typing import Dict
+from typing import Dict, Iterable, List, Optional
+from .scrapers.pool import get_client
+from .settings import settings
+from .fuzzy import get_matcher, learned_aliases
+
+_SPACES = re.compile(r"\s+")
+_STATE = re.compile(r"\bst\.?\b")
+_UNIVERSITY = re.compile(r"\b(u|univ)\.?\b")
+
+class NameNormalizer:
+    """Нормализация названий команд с мемоизацией
+
+    Один и тот же набор из нескольких сотен названий приходит от каждого
+    источника на каждом сборе, поэтому результат кешируется (LRU, maxsize записей).
+    """
+
+    def __init__(self, maxsize: int):
+        self.normalize = lru_cache(maxsize=maxsize)(self._normalize)
+
+    @staticmethod
+    def _normalize(s: str) -> str:
+        # Для ASCII-названий (почти все) unidecode не нужен
+        if not s.isascii():
+            s = unidecode(s)
+        s = s.lower().strip()
+        s = _SPACES.sub(" ", s)
+        s = s.replace("&", "and")
+        s = _STATE.sub("state", s)
+        s = _UNIVERSITY.sub("university", s)
+        return s
+
+    def normalize_many(self, names: Iterable[str]) -> List[str]:
+        """Нормализация всех названий источника разом"""
+        normalize = self.normalize
+        return [normalize(s) if s else "" for s in names]
+
+    def cache_info(self):
+        return self.normalize.cache_info()
+
+name_normalizer = NameNormalizer(settings.NORMALIZE_CACHE_SIZE)
 
 def normalize(s: str) -> str:
     """Нормализация названия команды для сопоставления"""
     if not s:
         return ""
-    
-    s = unidecode(s).lower().strip()
-    s = re.sub(r"\s+", " ", s)
-    s = s.replace("&", "and")
-    s = re.sub(r"\bst\.?\b", "state", s)
-    s = re.sub(r"\b(u|univ)\.?\b", "university", s)
-    return s
+    return name_normalizer.normalize(s)
 
-async def load_alias_map(csv_url: str) -> Dict[str, str]:
-    """Загрузка словаря алиасов команд из Google Sheet или локального файла"""
-    if csv_url.startswith("file://"):
-        # Локальный файл
-        file_path = csv_url.replace("file://", "")
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = f.read()
-    else:
-        # HTTP URL
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(csv_url)
-            response.raise_for_status()
-        data = response.content.decode("utf-8")
-    
+# Версия правил normalize: артефакт, собранный по другим правилам, пересобирается
+NORMALIZER_VERSION = 1
+
+def parse_alias_csv(data: str) -> Dict[str, str]:
+    """Словарь нормализованный алиас -> каноническое название из CSV"""
     alias_map = {}
     
     for row in csv.DictReader(io.StringIO(data)):
@@ -43,10 +71,167 @@ async def load_alias_map(csv_url: str) -> Dict[str, str]:
     
     return alias_map
 
-def canon_name(raw: str, alias_map: Dict[str, str]) -> str | None:
+def build_alias_artifact(data: str, source: str, etag: Optional[str] = None,
+                         last_modified: Optional[str] = None) -> dict:
+    """Скомпилированный словарь: ключи уже нормализованы, version - хеш исходного CSV"""
+    now = time.time()
+    return {
+        "version": hashlib.sha256(data.encode("utf-8")).hexdigest()[:16],
+        "normalizer": NORMALIZER_VERSION,
+        "source": source,
+        "etag": etag,
+        "lastModified": last_modified,
+        "builtAt": now,
+        "checkedAt": now,
+        "aliases": parse_alias_csv(data),
+    }
+
+def write_alias_artifact(path: str, artifact: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def read_alias_artifact(path: str, source: str) -> Optional[dict]:
+    """Артефакт с диска, если он собран из этого источника текущими правилами"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if artifact.get("normalizer") != NORMALIZER_VERSION or artifact.get("source") != source:
+        return None
+    return artifact
+
+class AliasMapCache:
+    """Словарь алиасов в памяти и на диске (ALIAS_MAP_PATH)
+
+    В пределах ALIAS_MAP_TTL_S словарь не перепроверяется. Потом - условный
+    запрос по ETag/Last-Modified; словарь пересобирается, только если изменилось
+    содержимое CSV. Если источник недоступен, работаем на последней удачной версии.
+    Пока версия не меняется, возвращается один и тот же объект словаря.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._artifact: Optional[dict] = None
+        self._map: Optional[Dict[str, str]] = None
+        self._learned_mtime: Optional[float] = None
+
+    async def get(self, csv_url: str) -> Dict[str, str]:
+        if self._artifact is None or self._artifact["source"] != csv_url:
+            self._artifact, self._map = read_alias_artifact(self.path, csv_url), None
+        
+        if self._artifact is None or time.time() - self._artifact.get("checkedAt", 0) >= settings.ALIAS_MAP_TTL_S:
+            try:
+                await self._revalidate(csv_url)
+            except Exception as e:
+                if self._artifact is None:
+                    raise
+                print(f"Alias map: refresh failed ({e}), using last good version {self._artifact['version']}")
+        
+        if self._map is None or self._learned_mtime != learned_aliases.mtime():
+            self._merge()
+        return self._map
+
+    async def _revalidate(self, csv_url: str):
+        artifact = self._artifact
+        etag = last_modified = None
+        if csv_url.startswith("file://"):
+            # Локальный файл
+            file_path = csv_url.replace("file://", "")
+            with open(file_path, "r", encoding="utf-8", newline="") as f:
+                data = f.read()
+        else:
+            # HTTP URL, условный запрос по валидаторам прошлой версии
+            headers = {}
+            if artifact and artifact.get("etag"):
+                headers["If-None-Match"] = artifact["etag"]
+            if artifact and artifact.get("lastModified"):
+                headers["If-Modified-Since"] = artifact["lastModified"]
+            response = await get_client().get(csv_url, headers=headers)
+            if artifact and response.status_code == 304:
+                self._touch()
+                return
+            response.raise_for_status()
+            data = response.content.decode("utf-8")
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+        
+        version = hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+        if artifact and artifact["version"] == version:
+            artifact.update(etag=etag, lastModified=last_modified)
+            self._touch()
+            return
+        
+        self._artifact = build_alias_artifact(data, csv_url, etag, last_modified)
+        self._map = None
+        print(f"Alias map: built version {self._artifact['version']} "
+              f"({len(self._artifact['aliases'])} aliases)")
+        self._save()
+
+    def _touch(self):
+        self._artifact["checkedAt"] = time.time()
+        self._save()
+
+    def _save(self):
+        try:
+            write_alias_artifact(self.path, self._artifact)
+        except OSError as e:
+            print(f"Alias map: failed to save {self.path}: {e}")
+
+    def _merge(self):
+        """Словарь из артефакта плюс проверенные алиасы, найденные нечетким поиском"""
+        alias_map = dict(self._artifact["aliases"])
+        # Проверенные (approved) алиасы из очереди нечеткого поиска идут в точный поиск
+        for alias, canonical in learned_aliases.load().items():
+            alias_map.setdefault(alias, canonical)
+        self._map = alias_map
+        self._learned_mtime = learned_aliases.mtime()
+
+    def version(self) -> Optional[str]:
+        return self._artifact["version"] if self._artifact else None
+
+alias_map_cache = AliasMapCache(settings.ALIAS_MAP_PATH)
+
+async def load_alias_map(csv_url: str) -> Dict[str, str]:
+    """Словарь алиасов команд из Google Sheet или локального файла (с кешем, см. AliasMapCache)"""
+    return await alias_map_cache.get(csv_url)
+
+def canon_name(raw: str, alias_map: Dict[str, str], source: Optional[str] = None) -> str | None:
     """Получение канонического названия команды по алиасу"""
     if not raw:
         return None
     
-    key = normalize(raw)
-    return alias_map.get(key)
+    key = name_normalizer.normalize(raw)
+    canonical = alias_map.get(key)
+    if canonical is None and settings.FUZZY_MATCH:
+        canonical = _fuzzy_canon(raw, key, alias_map, source)
+    return canonical
+
+def canon_names(raws: Iterable[str], alias_map: Dict[str, str],
+                source: Optional[str] = None) -> List[Optional[str]]:
+    """Канонические названия для списка сырых названий (None - не найдено)"""
+    raws = list(raws)
+    out = []
+    for raw, key in zip(raws, name_normalizer.normalize_many(raws)):
+        canonical = alias_map.get(key) if key else None
+        if canonical is None and key and settings.FUZZY_MATCH:
+            canonical = _fuzzy_canon(raw, key, alias_map, source)
+        out.append(canonical)
+    return out
+
+def _fuzzy_canon(raw: str, key: str, alias_map: Dict[str, str], source: Optional[str]) -> Optional[str]:
+    """Запасной нечеткий поиск для названий, которых нет в словаре"""
+    canonical = learned_aliases.lookup(key)
+    if canonical is None:
+        match = get_matcher(alias_map).match(key)
+        if match is None:
+            return None
+        canonical, alias, score = match
+        learned_aliases.learn(source, raw, key, canonical, alias, score)
+    learned_aliases.count(source, raw, key, canonical)
+    return canonical
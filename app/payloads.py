@@ -0,0 +1,103 @@
+import asyncio
+import gzip
+import hashlib
+from typing import Callable, Dict, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from .models import Snapshot
+from .settings import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class Payload:
+    """Готовое тело ответа и его сжатые варианты
+
+    У каждого варианта свой строгий ETag: хеш тела плюс суффикс кодировки.
+    """
+    __slots__ = ("media_type", "bodies", "etags")
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        self.bodies["gzip"] = gzip.compress(body, compresslevel=settings.PAYLOAD_GZIP_LEVEL)
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=settings.PAYLOAD_BROTLI_QUALITY)
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.etags = {
+            coding: f'"{digest}"' if coding == "identity" else f'"{digest}-{coding}"'
+            for coding in self.bodies
+        }
+
+    def response(self, request: Request) -> Response:
+        """Ответ на запрос: 304 по If-None-Match или подходящий вариант тела"""
+        coding = _choose_encoding(request.headers.get("accept-encoding", ""), self.bodies)
+        headers = {
+            "ETag": self.etags[coding],
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if _not_modified(request.headers.get("if-none-match"), self.etags.values()):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=self.bodies[coding], media_type=self.media_type, headers=headers)
+
+def _choose_encoding(accept_encoding: str, bodies: Dict[str, bytes]) -> str:
+    """Лучшая кодировка из Accept-Encoding, которая у нас есть (br, потом gzip)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    for coding in ("br", "gzip"):
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if coding in bodies and q > 0:
+            return coding
+    return "identity"
+
+def _not_modified(if_none_match: Optional[str], etags) -> bool:
+    """If-None-Match совпадает с одним из вариантов (слабое сравнение, как требует RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+class PayloadCache:
+    """Тело ответа, собранное один раз на версию снимка
+
+    SnapshotCache отдает один и тот же объект снимка, пока не сменится версия,
+    поэтому сначала сверяем сам объект. Новый объект с тем же содержимым
+    (например, при SNAPSHOT_CACHE=false каждый запрос читает снимок заново)
+    стоит только сборки тела: сжатые варианты переиспользуются. Сборка и сжатие
+    идут в потоке, чтобы не блокировать event loop; одновременные запросы ждут
+    одну сборку.
+    """
+
+    def __init__(self, build: Callable[[Optional[Snapshot]], bytes], media_type: str):
+        self._build = build
+        self.media_type = media_type
+        self._snapshot: Optional[Snapshot] = None
+        self._payload: Optional[Payload] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, snap: Optional[Snapshot]) -> Payload:
+        if self._payload is not None and self._snapshot is snap:
+            return self._payload
+        async with self._lock:
+            if self._payload is None or self._snapshot is not snap:
+                body = await asyncio.to_thread(self._build, snap)
+                if self._payload is None or self._payload.bodies["identity"] != body:
+                    self._payload = await asyncio.to_thread(Payload, body, self.media_type)
+                self._snapshot = snap
+        return self._payload
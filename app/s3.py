@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Optional
+import aioboto3
+from aiobotocore.config import AioConfig
+from .settings import settings
+
+_client: Optional[Any] = None
+_stack: Optional[AsyncExitStack] = None
+_lock = asyncio.Lock()
+
+def s3_configured() -> bool:
+    return all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.S3_BUCKET])
+
+async def get_s3_client():
+    """Общий для процесса S3-клиент (создается при первом обращении)
+
+    Учетные данные, endpoint и пул соединений настраиваются один раз,
+    TLS-соединения переиспользуются между запросами.
+    """
+    global _client, _stack
+    if _client is not None:
+        return _client
+    async with _lock:
+        if _client is None:
+            session = aioboto3.Session(
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_REGION,
+            )
+            config = AioConfig(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=10,
+                read_timeout=30,
+                tcp_keepalive=True,
+            )
+            stack = AsyncExitStack()
+            _client = await stack.enter_async_context(
+                session.client("s3", endpoint_url=settings.S3_ENDPOINT_URL, config=config)
+            )
+            _stack = stack
+    return _client
+
+async def start_s3_client():
+    """Создание клиента при старте приложения (только для DATA_BACKEND=s3)"""
+    if settings.DATA_BACKEND == "s3" and s3_configured():
+        await get_s3_client()
+
+async def close_s3_client():
+    """Закрытие клиента при остановке приложения"""
+    global _client, _stack
+    if _stack is not None:
+        await _stack.aclose()
+    _client = None
+    _stack = None
@@ -1,10 +1,71 @@
+from datetime import datetime, timedelta
+from typing import Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from pytz import timezone
-from .tasks import ingest_today
+from .tasks import ingest_today, refresh_source
+from .settings import settings
+from .storage import load_snapshot
+from .models import Snapshot
+from .scrapers.pool import warm_up
+
+ET = timezone("America/New_York")
+
+# Источники-рейтинги меняются медленно, линии букмекеров - весь день
+RATINGS_SOURCES = ["kenpom", "bart", "massey", "hasla"]
+ODDS_SOURCE = "odds"
+
+_scheduler: Optional[AsyncIOScheduler] = None
+
+def _tipoff_datetimes(snap: Snapshot):
+    """Время начала игр снимка в ET"""
+    for row in snap.rows:
+        if not row.tipoffET:
+            continue
+        try:
+            hour, minute = (int(part) for part in row.tipoffET.split(":"))
+            day = datetime.strptime(row.dateISO, "%Y-%m-%d")
+        except ValueError:
+            continue
+        # Источники пишут время без AM/PM; игры до 11 утра не проводятся
+        if hour < 11:
+            hour += 12
+        if hour > 23:
+            continue
+        yield ET.localize(day.replace(hour=hour, minute=minute))
+
+def odds_refresh_interval(snap: Optional[Snapshot], now: datetime) -> timedelta:
+    """Интервал до следующего обновления линий: чем ближе ближайшая игра, тем чаще"""
+    near = settings.ODDS_REFRESH_NEAR_MIN
+    far = settings.ODDS_REFRESH_FAR_MIN
+    upcoming = [t for t in _tipoff_datetimes(snap) if t > now] if snap else []
+    if not upcoming:
+        return timedelta(minutes=far)
+    
+    minutes_to_tip = (min(upcoming) - now).total_seconds() / 60
+    # Линейно от far (за ODDS_NEAR_WINDOW_MIN и раньше) до near (к началу игры)
+    share = min(1.0, minutes_to_tip / settings.ODDS_NEAR_WINDOW_MIN)
+    return timedelta(minutes=near + (far - near) * share)
+
+async def _odds_job():
+    """Обновление линий с перепланированием по ближайшему tipoff"""
+    try:
+        await refresh_source(ODDS_SOURCE)
+    finally:
+        now = datetime.now(ET)
+        interval = odds_refresh_interval(await load_snapshot(), now)
+        _scheduler.add_job(
+            _odds_job,
+            "date",
+            run_date=now + interval,
+            id="odds_refresh",
+            replace_existing=True
+        )
+        print(f"Next odds refresh in {interval.total_seconds() / 60:.0f} min")
 
 def start_scheduler():
     """Запуск планировщика задач"""
-    scheduler = AsyncIOScheduler(timezone=timezone("America/New_York"))
+    global _scheduler
+    scheduler = _scheduler = AsyncIOScheduler(timezone=ET)
     
     # Добавляем задачу на 12:00 ET каждый день
     scheduler.add_job(
@@ -16,5 +77,41 @@ def start_scheduler():
         replace_existing=True
     )
     
+    # Прогрев HTTP-пула за пару минут до сбора
+    if settings.HTTP_WARMUP:
+        scheduler.add_job(
+            warm_up,
+            "cron",
+            hour=11,
+            minute=58,
+            id="http_warmup",
+            replace_existing=True
+        )
+    
+    if settings.INTRADAY_REFRESH:
+        # Рейтинги: несколько раз в день, каждый источник отдельно
+        for name in RATINGS_SOURCES:
+            scheduler.add_job(
+                refresh_source,
+                "cron",
+                hour=settings.RATINGS_REFRESH_HOURS,
+                minute=settings.RATINGS_REFRESH_MINUTE,
+                args=[name],
+                id=f"refresh_{name}",
+                replace_existing=True
+            )
+        
+        # Линии: интервал сжимается по мере приближения tipoff
+        scheduler.add_job(
+            _odds_job,
+            "date",
+            run_date=datetime.now(ET) + timedelta(minutes=settings.ODDS_REFRESH_NEAR_MIN),
+            id="odds_refresh",
+            replace_existing=True
+        )
+    
     scheduler.start()
     print("Scheduler started - daily ingest at 12:00 ET")
+    if settings.INTRADAY_REFRESH:
+        print(f"Ratings refresh at hours {settings.RATINGS_REFRESH_HOURS} ET, "
+              f"odds every {settings.ODDS_REFRESH_NEAR_MIN}-{settings.ODDS_REFRESH_FAR_MIN} min")
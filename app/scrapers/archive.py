@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+from app.settings import settings
+
+class ResponseArchive:
+    """Архив сырых ответов источников для режимов record/replay
+
+    Раскладка: <dir>/<source>/<YYYY-MM-DD>/<HHMMSS>-<hash>.html.gz
+    и <dir>/<source>/index.jsonl со строкой на каждый сохраненный ответ.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # Момент времени для replay (epoch), None - самый свежий ответ
+        self.replay_at: Optional[float] = None
+        self._indexes: Dict[str, List[dict]] = {}
+
+    def _index_path(self, source: str) -> str:
+        return os.path.join(self.directory, source, "index.jsonl")
+
+    def record(self, source: str, url: str, response: httpx.Response):
+        """Сохранение ответа на запрос url в архив"""
+        now = time.time()
+        stamp = datetime.fromtimestamp(now)
+        day_dir = os.path.join(self.directory, source, stamp.strftime("%Y-%m-%d"))
+        name = f"{stamp.strftime('%H%M%S')}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.html.gz"
+
+        try:
+            os.makedirs(day_dir, exist_ok=True)
+            with gzip.open(os.path.join(day_dir, name), "wb") as f:
+                f.write(response.content)
+            entry = {
+                "url": url,
+                "ts": now,
+                "path": os.path.relpath(os.path.join(day_dir, name), self.directory),
+                "content_type": response.headers.get("Content-Type"),
+            }
+            with open(self._index_path(source), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Archive: failed to record {url}: {e}")
+            return
+        self._indexes.pop(source, None)
+
+    def entries(self, source: str) -> List[dict]:
+        """Все записи индекса источника в порядке записи"""
+        if source not in self._indexes:
+            entries = []
+            try:
+                with open(self._index_path(source), "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entries.append(json.loads(line))
+            except FileNotFoundError:
+                pass
+            self._indexes[source] = entries
+        return self._indexes[source]
+
+    def sources(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if os.path.exists(self._index_path(name))
+        )
+
+    def find(self, source: str, url: str, at: Optional[float] = None) -> Optional[dict]:
+        """Последний ответ для url, сохраненный не позже at"""
+        found = None
+        for entry in self.entries(source):
+            if entry["url"] != url or (at is not None and entry["ts"] > at):
+                continue
+            if found is None or entry["ts"] >= found["ts"]:
+                found = entry
+        return found
+
+    def replay(self, source: str, url: str, request: httpx.Request) -> httpx.Response:
+        """Ответ из архива вместо сетевого запроса"""
+        entry = self.find(source, url, self.replay_at)
+        if entry is None:
+            return httpx.Response(404, request=request)
+        with gzip.open(os.path.join(self.directory, entry["path"]), "rb") as f:
+            body = f.read()
+        headers = {"Content-Type": entry["content_type"]} if entry.get("content_type") else {}
+        return httpx.Response(200, content=body, headers=headers, request=request)
+
+archive = ResponseArchive(settings.ARCHIVE_DIR)
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import re
 from selectolax.parser import HTMLParser
 from .base import Scraper, RawGame
@@ -7,67 +7,52 @@ from .base import Scraper, RawGame
 class BartScraper(Scraper):
     source = "bart"
     
+    # Пробуем разные URL для BartTorvik
+    urls = [
+        "https://barttorvik.com/schedule.php",
+        "https://barttorvik.com/",
+        "https://barttorvik.com/trank.php"
+    ]
+    
+    # Добавляем больше заголовков для обхода защиты
+    # (без hop-by-hop Connection: с HTTP/2 такой заголовок недопустим)
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Upgrade-Insecure-Requests': '1',
+    }
+    
     async def fetch_today(self) -> List[RawGame]:
         """Парсинг BartTorvik schedule.php"""
-        games = []
-        
-        try:
-            # Пробуем разные URL для BartTorvik
-            urls = [
-                "https://barttorvik.com/schedule.php",
-                "https://barttorvik.com/",
-                "https://barttorvik.com/trank.php"
-            ]
-            
-            for url in urls:
-                try:
-                    # Добавляем больше заголовков для обхода защиты
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                        'Accept-Language': 'en-US,en;q=0.5',
-                        'Accept-Encoding': 'gzip, deflate',
-                        'Connection': 'keep-alive',
-                        'Upgrade-Insecure-Requests': '1',
-                    }
-                    
-                    response = await self.session.get(url, headers=headers)
-                    response.raise_for_status()
-                    
-                    await self._delay()
-                    
-                    html = HTMLParser(response.text)
-                    
-                    # Ищем таблицу с играми
-                    tables = html.css("table")
-                    if tables:
-                        # Берем первую таблицу с данными
-                        for table in tables:
-                            rows = table.css("tr")
-                            if len(rows) > 1:  # Есть данные
-                                for row in rows[1:]:  # Пропускаем заголовок
-                                    cells = row.css("td")
-                                    if len(cells) >= 3:  # Минимум 3 колонки
-                                        try:
-                                            game_data = self._parse_game_row(cells)
-                                            if game_data:
-                                                games.append(game_data)
-                                        except Exception as e:
-                                            print(f"BartTorvik: ошибка парсинга строки: {e}")
-                                            continue
-                                break
-                        break
-                        
-                except Exception as e:
-                    print(f"BartTorvik: ошибка с URL {url}: {e}")
-                    continue
-                    
-        except Exception as e:
-            print(f"BartTorvik scraper error: {e}")
-            # Не поднимаем исключение, просто возвращаем пустой список
-            return []
+        # Ошибки не глотаем: упавший источник должен дойти до предохранителя и last-good данных
+        return await self._fetch_candidates(self.urls, self._fetch_url)
+    
+    async def fetch_date(self, day: date) -> List[RawGame]:
+        """Парсинг BartTorvik schedule.php за указанную дату"""
+        games = await self._fetch_url(f"https://barttorvik.com/schedule.php?date={day.strftime('%Y%m%d')}")
+        return self._with_date(games, day)
+    
+    def iter_page(self, text: str) -> Iterator[RawGame]:
+        """Разбор страницы BartTorvik: первая таблица с данными"""
+        html = HTMLParser(text)
         
-        return games
+        # Берем первую таблицу с данными
+        for table in html.css("table"):
+            rows = table.css("tr")
+            if len(rows) > 1:  # Есть данные
+                for row in rows[1:]:  # Пропускаем заголовок
+                    cells = row.css("td")
+                    if len(cells) >= 3:  # Минимум 3 колонки
+                        try:
+                            game_data = self._parse_game_row(cells)
+                        except Exception as e:
+                            print(f"BartTorvik: ошибка парсинга строки: {e}")
+                            continue
+                        if game_data:
+                            yield game_data
+                break
     
     def _parse_game_row(self, cells) -> Optional[RawGame]:
         """Парсинг строки игры из BartTorvik"""
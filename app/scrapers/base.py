@@ -1,9 +1,16 @@
 from dataclasses import dataclass
 from datetime import date
-from typing import List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
 import asyncio
+import time
 import httpx
 from app.settings import settings
+from .ratelimit import rate_limiter
+from .pool import get_client, host_slot
+from .httpcache import http_cache
+from .archive import archive
+from .parsing import run_parse
+from .urlstats import url_stats
 
 @dataclass
 class RawGame:
@@ -16,27 +23,212 @@ class RawGame:
 
 class Scraper:
     source: str
+    # Запасные URL страницы игр дня (по порядку предпочтения)
+    urls: List[str] = []
+    # Дополнительные заголовки запросов страниц
+    HEADERS: Optional[Dict[str, str]] = None
+    # Через сколько игр потоковая выдача отдает управление event loop
+    STREAM_YIELD_EVERY = 20
     
     def __init__(self):
-        self.session = httpx.AsyncClient(
-            headers={"User-Agent": settings.USER_AGENT},
-            timeout=30.0,
-            follow_redirects=True
-        )
+        # Клиент общий для процесса и принадлежит пулу, скрейпер его не закрывает
+        self.session = get_client()
     
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.session.aclose()
+        pass
     
-    async def _delay(self):
-        """Задержка между запросами к одному домену"""
-        await asyncio.sleep(settings.HOST_DELAY_MS / 1000.0)
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """GET через архив (replay/record), кеш и лимит запросов к домену"""
+        if settings.SCRAPER_MODE == "replay":
+            return archive.replay(self.source, url, httpx.Request("GET", url))
+        
+        response = await self._cached_get(url, **kwargs)
+        if settings.SCRAPER_MODE == "record" and response.status_code == 200:
+            archive.record(self.source, url, response)
+        return response
+    
+    async def _cached_get(self, url: str, **kwargs) -> httpx.Response:
+        """GET с условным запросом к кешу"""
+        if not settings.HTTP_CACHE_ENABLED:
+            return await self._send_get(url, **kwargs)
+        
+        entry = http_cache.lookup(url)
+        if entry:
+            kwargs["headers"] = {**kwargs.get("headers", {}), **entry.validators()}
+        
+        response = await self._send_get(url, **kwargs)
+        if entry and response.status_code == 304:
+            http_cache.record(self.source, hit=True)
+            return entry.to_response(response.request)
+        
+        http_cache.record(self.source, hit=False)
+        http_cache.store(url, response)
+        return response
+    
+    async def _send_get(self, url: str, **kwargs) -> httpx.Response:
+        await rate_limiter.acquire(url)
+        async with host_slot(url):
+            return await self.session.get(url, **kwargs)
+    
+    async def _post(self, url: str, **kwargs) -> httpx.Response:
+        """POST с учетом лимита запросов к домену"""
+        if settings.SCRAPER_MODE == "replay":
+            # В replay сеть не трогаем (например, логин KenPom)
+            return httpx.Response(200, request=httpx.Request("POST", url))
+        await rate_limiter.acquire(url)
+        async with host_slot(url):
+            return await self.session.post(url, **kwargs)
     
     async def fetch_today(self) -> List[RawGame]:
         raise NotImplementedError
     
+    async def fetch_date(self, day: date) -> List[RawGame]:
+        """Игры за произвольную дату (для backfill); по умолчанию источник знает только сегодня"""
+        if day == date.today():
+            return await self.fetch_today()
+        raise NotImplementedError(f"{self.source}: игры за прошедшие даты не поддерживаются")
+    
+    @classmethod
+    def supports_history(cls) -> bool:
+        return cls.fetch_date is not Scraper.fetch_date
+    
+    def _with_date(self, games: List[RawGame], day: date) -> List[RawGame]:
+        """Парсеры ставят date.today(); для страниц за прошедшую дату ставим ее"""
+        for game in games:
+            game.date = day
+        return games
+    
+    async def _prepare(self):
+        """Подготовка перед загрузкой страниц (например, логин)"""
+        pass
+    
+    def iter_page(self, text: str) -> Iterator[RawGame]:
+        """Построчный разбор HTML страницы: игры отдаются по мере разбора строк таблицы"""
+        raise NotImplementedError
+    
+    def parse_page(self, text: str) -> Optional[List[RawGame]]:
+        """Синхронный разбор HTML страницы (выполняется в пуле парсинга)"""
+        return list(self.iter_page(text))
+    
+    async def _parse(self, text: str) -> Optional[List[RawGame]]:
+        """Разбор страницы в пуле PARSE_EXECUTOR, не блокируя event loop"""
+        rows = await run_parse(type(self), text)
+        if rows is None:
+            return None
+        return [RawGame(*row) for row in rows]
+    
+    async def _fetch_page(self, url: str) -> str:
+        """Загрузка HTML одного URL"""
+        kwargs = {"headers": self.HEADERS} if self.HEADERS else {}
+        response = await self._get(url, **kwargs)
+        response.raise_for_status()
+        return response.text
+    
+    async def _fetch_url(self, url: str) -> List[RawGame]:
+        """Загрузка и разбор одного URL"""
+        return await self._parse(await self._fetch_page(url))
+    
+    async def stream_today(self) -> AsyncIterator[RawGame]:
+        """Игры дня по одной, как только разобрана страница
+
+        Страница разбирается целиком в пуле PARSE_EXECUTOR (как в fetch_today),
+        а игры отдаются потребителю сразу, не дожидаясь остальных источников.
+        Запасные URL перебираются по очереди (без гонки); если упали все URL,
+        поднимается исключение, как в _fetch_candidates.
+        Скрейпер без списка urls отдает результат fetch_today.
+        """
+        if not self.urls:
+            for game in await self.fetch_today():
+                yield game
+            return
+        
+        await self._prepare()
+        ordered = url_stats.order(self.source, self.urls)
+        errors: List[str] = []
+        try:
+            for url in ordered:
+                started = time.monotonic()
+                try:
+                    games = await self._fetch_url(url) or []
+                except Exception as e:
+                    print(f"{self.source}: ошибка с URL {url}: {e}")
+                    errors.append(f"{url}: {e}")
+                    games = []
+                url_stats.record(self.source, url, bool(games), time.monotonic() - started)
+                if not games:
+                    continue
+                for count, game in enumerate(games, 1):
+                    yield game
+                    if count % self.STREAM_YIELD_EVERY == 0:
+                        # Прикрепление идет в event loop, даем поработать остальным задачам
+                        await asyncio.sleep(0)
+                return
+        finally:
+            url_stats.save()
+        if len(errors) == len(ordered):
+            raise RuntimeError(f"{self.source}: all URLs failed: {'; '.join(errors)}")
+    
+    async def _fetch_candidates(self, urls: List[str],
+                                fetch_url: Callable[[str], Awaitable[Optional[List[RawGame]]]]) -> List[RawGame]:
+        """Игры с первого сработавшего URL из списка запасных
+
+        Сначала пробуем URL, который сработал в прошлый раз (или лучший по статистике),
+        если он не дал игр - остальные кандидаты запускаются гонкой с хеджированием.
+        Если упали все URL, это сбой источника (исключение), а не пустой день.
+        """
+        ordered = url_stats.order(self.source, urls)
+        errors: List[str] = []
+        try:
+            games = await self._try_url(ordered[0], fetch_url, errors)
+            if games:
+                return games
+            games = await self._race_urls(ordered[1:], fetch_url, errors)
+            if games:
+                return games
+        finally:
+            url_stats.save()
+        if len(errors) == len(ordered):
+            raise RuntimeError(f"{self.source}: all URLs failed: {'; '.join(errors)}")
+        return []
+    
+    async def _try_url(self, url: str, fetch_url, errors: List[str]) -> List[RawGame]:
+        """Одна попытка с записью успешности и задержки URL (ошибки копятся в errors)"""
+        started = time.monotonic()
+        try:
+            games = await fetch_url(url)
+        except Exception as e:
+            print(f"{self.source}: ошибка с URL {url}: {e}")
+            errors.append(f"{url}: {e}")
+            games = None
+        url_stats.record(self.source, url, bool(games), time.monotonic() - started)
+        return games or []
+    
+    async def _race_urls(self, urls: List[str], fetch_url, errors: List[str]) -> List[RawGame]:
+        """Гонка кандидатов: следующий стартует после неудачи или через URL_HEDGE_DELAY_S"""
+        queue = list(urls)
+        pending = set()
+        try:
+            while queue or pending:
+                if queue and len(pending) < settings.URL_HEDGE_MAX_PARALLEL:
+                    pending.add(asyncio.create_task(self._try_url(queue.pop(0), fetch_url, errors)))
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=settings.URL_HEDGE_DELAY_S if queue else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    games = task.result()
+                    if games:
+                        return games
+        finally:
+            # Проигравшие запросы отменяем
+            for task in pending:
+                task.cancel()
+        return []
+    
     def _parse_float(self, text: str) -> Optional[float]:
         """Безопасное извлечение float из текста"""
         if not text:
@@ -1,46 +1,19 @@
 from datetime import date
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import re
 from selectolax.parser import HTMLParser
 from .base import Scraper, RawGame
 
 class HaslaScraper(Scraper):
     source = "hasla"
+    urls = ["https://haslametrics.com/"]
     
     async def fetch_today(self) -> List[RawGame]:
         """Парсинг Haslametrics (последняя таблица игр дня)"""
         games = []
         
         try:
-            url = "https://haslametrics.com/"
-            response = await self.session.get(url)
-            response.raise_for_status()
-            
-            await self._delay()
-            
-            html = HTMLParser(response.text)
-            
-            # Ищем последнюю таблицу с играми дня
-            tables = html.css("table")
-            if not tables:
-                raise RuntimeError("Haslametrics: не найдены таблицы с играми")
-            
-            # Берем последнюю таблицу (предполагаем что это сегодняшние игры)
-            table = tables[-1]
-            
-            rows = table.css("tr")
-            for row in rows[1:]:  # Пропускаем заголовок
-                cells = row.css("td")
-                if len(cells) < 6:
-                    continue
-                
-                try:
-                    game_data = self._parse_game_row(cells)
-                    if game_data:
-                        games.append(game_data)
-                except Exception as e:
-                    print(f"Haslametrics: ошибка парсинга строки: {e}")
-                    continue
+            games = await self._fetch_url(self.urls[0])
                     
         except Exception as e:
             print(f"Haslametrics scraper error: {e}")
@@ -48,6 +21,32 @@ class HaslaScraper(Scraper):
         
         return games
     
+    def iter_page(self, text: str) -> Iterator[RawGame]:
+        """Разбор страницы Haslametrics: последняя таблица - игры дня"""
+        html = HTMLParser(text)
+        
+        # Ищем последнюю таблицу с играми дня
+        tables = html.css("table")
+        if not tables:
+            raise RuntimeError("Haslametrics: не найдены таблицы с играми")
+        
+        # Берем последнюю таблицу (предполагаем что это сегодняшние игры)
+        table = tables[-1]
+        
+        rows = table.css("tr")
+        for row in rows[1:]:  # Пропускаем заголовок
+            cells = row.css("td")
+            if len(cells) < 6:
+                continue
+            
+            try:
+                game_data = self._parse_game_row(cells)
+            except Exception as e:
+                print(f"Haslametrics: ошибка парсинга строки: {e}")
+                continue
+            if game_data:
+                yield game_data
+    
     def _parse_game_row(self, cells) -> Optional[RawGame]:
         """Парсинг строки игры из Haslametrics"""
         try:
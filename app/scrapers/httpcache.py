@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+import httpx
+from app.settings import settings
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+
+    def validators(self) -> Dict[str, str]:
+        """Заголовки условного запроса"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        """Ответ 200 из закешированного тела (для 304 Not Modified)"""
+        headers = {"Content-Type": self.content_type} if self.content_type else {}
+        return httpx.Response(200, content=self.body, headers=headers, request=request)
+
+class HttpCache:
+    """Дисковый кеш ответов для условных GET (ETag / Last-Modified)"""
+
+    def __init__(self, directory: str, ttl_s: float, max_bytes: int):
+        self.directory = directory
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".body", base + ".json"
+
+    def _remove(self, url: str):
+        for path in self._paths(url):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Запись кеша для url, если она есть и не старше TTL"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if time.time() - meta["stored_at"] > self.ttl_s:
+                self._remove(url)
+                return None
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return CacheEntry(
+            url=url,
+            body=body,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            content_type=meta.get("content_type"),
+        )
+
+    def store(self, url: str, response: httpx.Response):
+        """Сохранение ответа, если сервер дал валидаторы"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(body_path, "wb") as f:
+                f.write(response.content)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content_type": response.headers.get("Content-Type"),
+                    "stored_at": time.time(),
+                    "size": len(response.content),
+                }, f)
+        except OSError as e:
+            print(f"HTTP cache: failed to store {url}: {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        """Удаление самых старых записей, пока кеш больше max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.append((meta.get("stored_at", 0), meta.get("size", 0), meta.get("url", "")))
+            total += meta.get("size", 0)
+
+        for _, size, url in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(url)
+            total -= size
+
+    def record(self, source: str, hit: bool):
+        counters = self._stats.setdefault(source, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Попадания/промахи кеша по источникам"""
+        return {source: dict(counters) for source, counters in self._stats.items()}
+
+http_cache = HttpCache(
+    settings.HTTP_CACHE_DIR,
+    settings.HTTP_CACHE_TTL_S,
+    settings.HTTP_CACHE_MAX_MB * 1024 * 1024,
+)
@@ -1,65 +1,39 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
+import asyncio
 import re
 from selectolax.parser import HTMLParser
 from .base import Scraper, RawGame
+from .sessions import SessionStore
 from app.settings import settings
 
+# Признаки страницы для незалогиненного пользователя
+LOGGED_OUT_MARKERS = ('name="password"', "name='password'")
+
 class KenPomScraper(Scraper):
     source = "kenpom"
     
+    # Пробуем разные URL для KenPom
+    urls = [
+        "https://kenpom.com/fanmatch.php",
+        "https://kenpom.com/",
+        "https://kenpom.com/schedule.php",
+        "https://kenpom.com/games.php"
+    ]
+    
+    # Сессия общая для всех экземпляров в процессе и для других процессов (через файл)
+    session_store = SessionStore(settings.KENPOM_SESSION_PATH, "kenpom.com")
+    _login_lock = asyncio.Lock()
+    
     async def fetch_today(self) -> List[RawGame]:
         """Парсинг KenPom fanmatch.php"""
         games = []
         
         try:
             # Сначала логинимся если нужно
-            if settings.KENPOM_EMAIL and settings.KENPOM_PASSWORD:
-                await self._login()
-            elif settings.KENPOM_COOKIE:
-                self.session.cookies.update({"KPSID": settings.KENPOM_COOKIE})
+            await self._prepare()
             
-            # Пробуем разные URL для KenPom
-            urls = [
-                "https://kenpom.com/fanmatch.php",
-                "https://kenpom.com/",
-                "https://kenpom.com/schedule.php",
-                "https://kenpom.com/games.php"
-            ]
-            
-            for url in urls:
-                try:
-                    response = await self.session.get(url)
-                    response.raise_for_status()
-                    
-                    await self._delay()
-                    
-                    html = HTMLParser(response.text)
-                    
-                    # Ищем таблицы с играми
-                    tables = html.css("table")
-                    if tables:
-                        for table in tables:
-                            rows = table.css("tr")
-                            if len(rows) > 1:  # Есть данные
-                                for row in rows[1:]:  # Пропускаем заголовок
-                                    cells = row.css("td")
-                                    if len(cells) >= 3:  # Минимум 3 колонки
-                                        try:
-                                            game_data = self._parse_game_row(cells)
-                                            if game_data:
-                                                games.append(game_data)
-                                        except Exception as e:
-                                            print(f"KenPom: ошибка парсинга строки: {e}")
-                                            continue
-                                if games:  # Если нашли игры, выходим
-                                    break
-                        if games:
-                            break
-                            
-                except Exception as e:
-                    print(f"KenPom: ошибка с URL {url}: {e}")
-                    continue
+            games = await self._fetch_candidates(self.urls, self._fetch_url)
                     
         except Exception as e:
             print(f"KenPom scraper error: {e}")
@@ -72,7 +46,7 @@ class KenPomScraper(Scraper):
         login_url = "https://kenpom.com/login.php"
         
         # Получаем страницу логина
-        response = await self.session.get(login_url)
+        response = await self._get(login_url)
         response.raise_for_status()
         
         # Отправляем данные логина
@@ -81,10 +55,71 @@ class KenPomScraper(Scraper):
             "password": settings.KENPOM_PASSWORD
         }
         
-        response = await self.session.post(login_url, data=login_data)
+        response = await self._post(login_url, data=login_data)
         response.raise_for_status()
+        # Неверный логин KenPom тоже отдает 200 - снова с формой входа
+        if self._logged_out(response.text):
+            raise RuntimeError("KenPom login failed: login form returned again")
+        self.session_store.save(self.session, settings.KENPOM_SESSION_TTL_H * 3600)
+        
+    async def fetch_date(self, day: date) -> List[RawGame]:
+        """Парсинг KenPom fanmatch.php за указанную дату"""
+        await self._prepare()
+        games = await self._fetch_url(f"https://kenpom.com/fanmatch.php?d={day.strftime('%Y-%m-%d')}")
+        return self._with_date(games, day)
+    
+    async def _prepare(self):
+        """Логин или cookie из настроек"""
+        if settings.KENPOM_EMAIL and settings.KENPOM_PASSWORD:
+            # Логинимся, только если нет ни живой сессии в клиенте, ни сохраненной на диске
+            async with self._login_lock:
+                if self.session_store.has_session(self.session):
+                    return
+                if self.session_store.restore(self.session):
+                    print("KenPom: reusing saved session")
+                    return
+                await self._login()
+        elif settings.KENPOM_COOKIE:
+            # Клиент общий, поэтому cookie привязываем к домену KenPom
+            self.session.cookies.set("KPSID", settings.KENPOM_COOKIE, domain="kenpom.com")
+    
+    async def _fetch_page(self, url: str) -> str:
+        """Загрузка страницы; если нас разлогинило - перелогин и один повтор"""
+        text = await super()._fetch_page(url)
+        if settings.KENPOM_EMAIL and settings.KENPOM_PASSWORD and self._logged_out(text):
+            print("KenPom: session expired, logging in again")
+            async with self._login_lock:
+                self.session_store.clear(self.session)
+                await self._login()
+            text = await super()._fetch_page(url)
+        return text
+    
+    @staticmethod
+    def _logged_out(text: str) -> bool:
+        return any(marker in text for marker in LOGGED_OUT_MARKERS)
+    
+    def iter_page(self, text: str) -> Iterator[RawGame]:
+        """Разбор страницы KenPom: игры из первой таблицы, где они нашлись"""
+        html = HTMLParser(text)
         
-        await self._delay()
+        # Ищем таблицы с играми
+        for table in html.css("table"):
+            found = False
+            rows = table.css("tr")
+            if len(rows) > 1:  # Есть данные
+                for row in rows[1:]:  # Пропускаем заголовок
+                    cells = row.css("td")
+                    if len(cells) >= 3:  # Минимум 3 колонки
+                        try:
+                            game_data = self._parse_game_row(cells)
+                        except Exception as e:
+                            print(f"KenPom: ошибка парсинга строки: {e}")
+                            continue
+                        if game_data:
+                            found = True
+                            yield game_data
+                if found:  # Если нашли игры, выходим
+                    break
     
     def _parse_game_row(self, cells) -> Optional[RawGame]:
         """Парсинг строки игры из KenPom"""
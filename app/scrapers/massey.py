@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import re
 from selectolax.parser import HTMLParser
 from .base import Scraper, RawGame
@@ -7,60 +7,47 @@ from .base import Scraper, RawGame
 class MasseyScraper(Scraper):
     source = "massey"
     
+    # Пробуем разные URL для Massey Ratings
+    urls = [
+        "https://masseyratings.com/cb/ncaa-d1/games",
+        "https://masseyratings.com/cb/",
+        "https://masseyratings.com/",
+        "https://masseyratings.com/cb/ncaa-d1/",
+        "https://masseyratings.com/cb/ncaa-d1/schedule"
+    ]
+    
     async def fetch_today(self) -> List[RawGame]:
         """Парсинг MasseyRatings"""
-        games = []
-        
-        try:
-            # Пробуем разные URL для Massey Ratings
-            urls = [
-                "https://masseyratings.com/cb/ncaa-d1/games",
-                "https://masseyratings.com/cb/",
-                "https://masseyratings.com/",
-                "https://masseyratings.com/cb/ncaa-d1/",
-                "https://masseyratings.com/cb/ncaa-d1/schedule"
-            ]
-            
-            for url in urls:
-                try:
-                    response = await self.session.get(url)
-                    response.raise_for_status()
-                    
-                    await self._delay()
-                    
-                    html = HTMLParser(response.text)
-                    
-                    # Ищем таблицы с играми
-                    tables = html.css("table")
-                    if tables:
-                        for table in tables:
-                            rows = table.css("tr")
-                            if len(rows) > 1:  # Есть данные
-                                for row in rows[1:]:  # Пропускаем заголовок
-                                    cells = row.css("td")
-                                    if len(cells) >= 3:  # Минимум 3 колонки
-                                        try:
-                                            game_data = self._parse_game_row(cells)
-                                            if game_data:
-                                                games.append(game_data)
-                                        except Exception as e:
-                                            print(f"MasseyRatings: ошибка парсинга строки: {e}")
-                                            continue
-                                if games:  # Если нашли игры, выходим
-                                    break
-                        if games:
-                            break
-                            
-                except Exception as e:
-                    print(f"MasseyRatings: ошибка с URL {url}: {e}")
-                    continue
-                    
-        except Exception as e:
-            print(f"MasseyRatings scraper error: {e}")
-            # Не поднимаем исключение, просто возвращаем пустой список
-            return []
+        # Ошибки не глотаем: упавший источник должен дойти до предохранителя и last-good данных
+        return await self._fetch_candidates(self.urls, self._fetch_url)
+    
+    async def fetch_date(self, day: date) -> List[RawGame]:
+        """Парсинг MasseyRatings games за указанную дату"""
+        games = await self._fetch_url(f"https://masseyratings.com/cb/ncaa-d1/games?dt={day.strftime('%Y%m%d')}")
+        return self._with_date(games, day)
+    
+    def iter_page(self, text: str) -> Iterator[RawGame]:
+        """Разбор страницы MasseyRatings: игры из первой таблицы, где они нашлись"""
+        html = HTMLParser(text)
         
-        return games
+        # Ищем таблицы с играми
+        for table in html.css("table"):
+            found = False
+            rows = table.css("tr")
+            if len(rows) > 1:  # Есть данные
+                for row in rows[1:]:  # Пропускаем заголовок
+                    cells = row.css("td")
+                    if len(cells) >= 3:  # Минимум 3 колонки
+                        try:
+                            game_data = self._parse_game_row(cells)
+                        except Exception as e:
+                            print(f"MasseyRatings: ошибка парсинга строки: {e}")
+                            continue
+                        if game_data:
+                            found = True
+                            yield game_data
+                if found:  # Если нашли игры, выходим
+                    break
     
     def _parse_game_row(self, cells) -> Optional[RawGame]:
         """Парсинг строки игры из MasseyRatings"""
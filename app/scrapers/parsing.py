@@ -0,0 +1,47 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Type
+from app.settings import settings
+
+_executor: Optional[Executor] = None
+
+def get_executor() -> Optional[Executor]:
+    """Пул для парсинга HTML согласно PARSE_EXECUTOR (None - парсим в event loop)"""
+    global _executor
+    if _executor is None and settings.PARSE_EXECUTOR != "inline":
+        if settings.PARSE_EXECUTOR == "process":
+            # spawn: в процессе веб-сервера уже работают потоки (планировщик, пул)
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PARSE_WORKERS,
+                thread_name_prefix="parse",
+            )
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _parse_in_worker(scraper_cls: Type, text: str) -> Optional[List[tuple]]:
+    """Парсинг в воркере; обратно отправляем компактные кортежи, а не объекты"""
+    # Парсеру не нужен HTTP-клиент, поэтому __init__ не вызываем
+    scraper = scraper_cls.__new__(scraper_cls)
+    games = scraper.parse_page(text)
+    if games is None:
+        return None
+    return [(g.date, g.tipoff_et, g.home, g.away, g.neutral, g.metrics) for g in games]
+
+async def run_parse(scraper_cls: Type, text: str) -> Optional[List[tuple]]:
+    """Запуск scraper_cls.parse_page(text) вне event loop, результат - кортежи полей RawGame"""
+    executor = get_executor()
+    if executor is None:
+        return _parse_in_worker(scraper_cls, text)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, _parse_in_worker, scraper_cls, text)
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Dict, Optional
+import httpx
+from app.settings import settings
+from .ratelimit import rate_limiter, host_of
+
+# Корневые страницы источников, с которыми заранее поднимаем соединения
+WARMUP_URLS = [
+    "https://kenpom.com/",
+    "https://barttorvik.com/",
+    "https://masseyratings.com/",
+    "https://haslametrics.com/",
+    "https://www.teamrankings.com/",
+]
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+def _http2_enabled() -> bool:
+    """HTTP/2 включаем только если установлен пакет h2"""
+    if not settings.HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("HTTP/2 disabled: package 'h2' is not installed")
+        return False
+    return True
+
+def get_client() -> httpx.AsyncClient:
+    """Общий для процесса HTTP-клиент (создается при первом обращении)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers={"User-Agent": settings.USER_AGENT},
+            timeout=30.0,
+            follow_redirects=True,
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_S,
+            ),
+        )
+    return _client
+
+def host_slot(url: str) -> asyncio.Semaphore:
+    """Ограничение числа одновременных соединений к одному домену"""
+    host = host_of(url)
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(settings.HTTP_MAX_PER_HOST)
+    return slot
+
+async def start_client_pool():
+    """Создание пула при старте приложения"""
+    get_client()
+
+async def close_client_pool():
+    """Закрытие пула при остановке приложения"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+async def _warm_up_url(url: str):
+    try:
+        await rate_limiter.acquire(url)
+        async with host_slot(url):
+            await get_client().head(url)
+    except Exception as e:
+        print(f"Warm-up failed for {url}: {e}")
+
+async def warm_up():
+    """Прогрев соединений (DNS, TLS) перед плановым сбором данных"""
+    await asyncio.gather(*(_warm_up_url(url) for url in WARMUP_URLS))
+    print(f"HTTP pool warmed up for {len(WARMUP_URLS)} hosts")
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+from app.settings import settings
+
+def host_of(url: str) -> str:
+    """Домен для учета лимитов (www.example.com и example.com считаются одним хостом)"""
+    host = urlsplit(url).hostname or url
+    return host[4:] if host.startswith("www.") else host
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не более burst в запасе"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Забрать один токен, возвращает сколько секунд пришлось ждать (включая очередь)"""
+        started = time.monotonic()
+        async with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill(time.monotonic())
+            self.tokens -= 1
+        return time.monotonic() - started
+
+class HostRateLimiter:
+    """Общий для всех скрейперов лимитер запросов по доменам"""
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._throttled: Dict[str, float] = {}
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            # По умолчанию один запрос в HOST_DELAY_MS, как и раньше, но без сна после запроса
+            rate = settings.HOST_RATES.get(host, 1000.0 / max(settings.HOST_DELAY_MS, 1))
+            burst = settings.HOST_BURSTS.get(host, settings.HOST_BURST)
+            bucket = self._buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, url: str) -> float:
+        """Дождаться разрешения на запрос к домену url"""
+        host = host_of(url)
+        waited = await self._bucket(host).acquire()
+        self._throttled[host] = self._throttled.get(host, 0.0) + waited
+        return waited
+
+    def stats(self) -> Dict[str, float]:
+        """Суммарное время ожидания по доменам, в секундах"""
+        return {host: round(waited, 3) for host, waited in self._throttled.items()}
+
+rate_limiter = HostRateLimiter()
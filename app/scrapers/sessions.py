@@ -0,0 +1,93 @@
+import json
+import os
+import time
+from http.cookiejar import Cookie
+from typing import Optional
+import httpx
+
+class SessionStore:
+    """Cookie авторизованной сессии источника на диске, чтобы не логиниться каждый запуск
+
+    Файл: {"expires": ts, "cookies": [{"name", "value", "domain", "path", "expires"}]}.
+    Общий для процессов: кто залогинился, тот и пишет, остальные подхватывают.
+    """
+
+    def __init__(self, path: str, domain: str):
+        self.path = path
+        self.domain = domain
+        # Cookie в клиенте получены успешным логином или восстановлены из файла.
+        # Одних cookie домена мало: PHPSESSID оставляют и прогрев, и неудачный логин
+        self._authenticated = False
+
+    def _cookies(self, client: httpx.AsyncClient):
+        return [c for c in client.cookies.jar if c.domain.lstrip(".").endswith(self.domain)]
+
+    def has_session(self, client: httpx.AsyncClient) -> bool:
+        """Есть ли в клиенте неистекшие cookie авторизованной сессии"""
+        if not self._authenticated:
+            return False
+        now = time.time()
+        return any(c.expires is None or c.expires > now for c in self._cookies(client))
+
+    def restore(self, client: httpx.AsyncClient) -> bool:
+        """Загрузка сохраненной сессии в клиент, False - сессии нет или она истекла"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        now = time.time()
+        if data.get("expires", 0) <= now:
+            return False
+        restored = 0
+        for c in data.get("cookies", []):
+            if c.get("expires") is not None and c["expires"] <= now:
+                continue
+            client.cookies.jar.set_cookie(Cookie(
+                version=0, name=c["name"], value=c["value"], port=None, port_specified=False,
+                domain=c["domain"], domain_specified=True, domain_initial_dot=c["domain"].startswith("."),
+                path=c.get("path", "/"), path_specified=True, secure=True, expires=c.get("expires"),
+                discard=False, comment=None, comment_url=None, rest={}
+            ))
+            restored += 1
+        self._authenticated = restored > 0
+        return self._authenticated
+
+    def save(self, client: httpx.AsyncClient, ttl_s: float):
+        """Сохранение cookie домена после успешного логина; срок - ближайший из expires cookie и ttl_s"""
+        self._authenticated = True
+        cookies = self._cookies(client)
+        if not cookies:
+            return
+        expires = time.time() + ttl_s
+        expires = min([expires] + [c.expires for c in cookies if c.expires is not None])
+        data = {
+            "expires": expires,
+            "cookies": [
+                {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expires": c.expires}
+                for c in cookies
+            ],
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            # Файл с cookie - только для владельца
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Session store: failed to save {self.path}: {e}")
+
+    def clear(self, client: Optional[httpx.AsyncClient] = None):
+        """Сессия больше не действует: удаляем файл и cookie домена из клиента"""
+        self._authenticated = False
+        if client is not None:
+            for c in self._cookies(client):
+                client.cookies.jar.clear(c.domain, c.path, c.name)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
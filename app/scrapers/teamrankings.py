@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import re
 from selectolax.parser import HTMLParser
 from .base import Scraper, RawGame
@@ -7,60 +7,42 @@ from .base import Scraper, RawGame
 class TeamRankingsScraper(Scraper):
     source = "teamrankings"
     
+    # Пробуем разные URL для TeamRankings
+    urls = [
+        "https://www.teamrankings.com/ncb/odds/",
+        "https://www.teamrankings.com/ncaa-basketball/",
+        "https://www.teamrankings.com/ncb/",
+        "https://www.teamrankings.com/",
+        "https://www.teamrankings.com/ncb/schedule"
+    ]
+    
     async def fetch_today(self) -> List[RawGame]:
         """Парсинг TeamRankings ncb/odds/ (линии/тоталы/манилайны)"""
-        games = []
-        
-        try:
-            # Пробуем разные URL для TeamRankings
-            urls = [
-                "https://www.teamrankings.com/ncb/odds/",
-                "https://www.teamrankings.com/ncaa-basketball/",
-                "https://www.teamrankings.com/ncb/",
-                "https://www.teamrankings.com/",
-                "https://www.teamrankings.com/ncb/schedule"
-            ]
-            
-            for url in urls:
-                try:
-                    response = await self.session.get(url)
-                    response.raise_for_status()
-                    
-                    await self._delay()
-                    
-                    html = HTMLParser(response.text)
-                    
-                    # Ищем таблицы с играми
-                    tables = html.css("table")
-                    if tables:
-                        for table in tables:
-                            rows = table.css("tr")
-                            if len(rows) > 1:  # Есть данные
-                                for row in rows[1:]:  # Пропускаем заголовок
-                                    cells = row.css("td")
-                                    if len(cells) >= 3:  # Минимум 3 колонки
-                                        try:
-                                            game_data = self._parse_game_row(cells)
-                                            if game_data:
-                                                games.append(game_data)
-                                        except Exception as e:
-                                            print(f"TeamRankings: ошибка парсинга строки: {e}")
-                                            continue
-                                if games:  # Если нашли игры, выходим
-                                    break
-                        if games:
-                            break
-                            
-                except Exception as e:
-                    print(f"TeamRankings: ошибка с URL {url}: {e}")
-                    continue
-                    
-        except Exception as e:
-            print(f"TeamRankings scraper error: {e}")
-            # Не поднимаем исключение, просто возвращаем пустой список
-            return []
+        # Ошибки не глотаем: упавший источник должен дойти до предохранителя и last-good данных
+        return await self._fetch_candidates(self.urls, self._fetch_url)
+    
+    def iter_page(self, text: str) -> Iterator[RawGame]:
+        """Разбор страницы TeamRankings: игры из первой таблицы, где они нашлись"""
+        html = HTMLParser(text)
         
-        return games
+        # Ищем таблицы с играми
+        for table in html.css("table"):
+            found = False
+            rows = table.css("tr")
+            if len(rows) > 1:  # Есть данные
+                for row in rows[1:]:  # Пропускаем заголовок
+                    cells = row.css("td")
+                    if len(cells) >= 3:  # Минимум 3 колонки
+                        try:
+                            game_data = self._parse_game_row(cells)
+                        except Exception as e:
+                            print(f"TeamRankings: ошибка парсинга строки: {e}")
+                            continue
+                        if game_data:
+                            found = True
+                            yield game_data
+                if found:  # Если нашли игры, выходим
+                    break
     
     def _parse_game_row(self, cells) -> Optional[RawGame]:
         """Парсинг строки игры из TeamRankings"""
@@ -0,0 +1,83 @@
+import json
+import os
+from typing import Dict, List, Optional
+from app.settings import settings
+
+class UrlStats:
+    """Память о запасных URL источников: последний рабочий URL, успешность и задержка
+
+    Хранится в JSON между запусками:
+    {source: {"last_good": url, "urls": {url: {"ok": n, "fail": n, "latency_ms": ewma}}}}
+
+    В режиме replay статистика только читается: ответы из архива (и 404 для
+    неархивированных URL) ничего не говорят о живых источниках.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _source(self, source: str) -> dict:
+        return self._load().setdefault(source, {"last_good": None, "urls": {}})
+
+    def order(self, source: str, urls: List[str]) -> List[str]:
+        """Кандидаты в порядке попыток: последний рабочий, затем по успешности и задержке"""
+        entry = self._source(source)
+        stats = entry["urls"]
+
+        def score(item):
+            position, url = item
+            s = stats.get(url, {})
+            ok, fail = s.get("ok", 0), s.get("fail", 0)
+            # Сглаживание Лапласа: у нового URL оценка 0.5
+            rate = (ok + 1) / (ok + fail + 2)
+            return (-rate, s.get("latency_ms", float("inf")), position)
+
+        ordered = [url for _, url in sorted(enumerate(urls), key=score)]
+        last_good = entry.get("last_good")
+        if last_good in ordered:
+            ordered.remove(last_good)
+            ordered.insert(0, last_good)
+        return ordered
+
+    def record(self, source: str, url: str, ok: bool, latency_s: float):
+        if settings.SCRAPER_MODE == "replay":
+            return
+        entry = self._source(source)
+        s = entry["urls"].setdefault(url, {"ok": 0, "fail": 0})
+        s["ok" if ok else "fail"] += 1
+        if ok:
+            latency_ms = latency_s * 1000
+            previous = s.get("latency_ms")
+            s["latency_ms"] = round(latency_ms if previous is None else 0.7 * previous + 0.3 * latency_ms, 1)
+            entry["last_good"] = url
+        elif entry.get("last_good") == url:
+            entry["last_good"] = None
+
+    def save(self):
+        if self._data is None or settings.SCRAPER_MODE == "replay":
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"URL stats: failed to save {self.path}: {e}")
+
+    def stats(self) -> Dict[str, dict]:
+        return self._load()
+
+url_stats = UrlStats(settings.URL_STATS_PATH)
@@ -1,24 +1,94 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict
 
 class Settings(BaseSettings):
-    DATA_BACKEND: str = "local"  # "s3" | "local"
+    DATA_BACKEND: str = "local"  # "s3" | "local" | "sqlite"
     AWS_REGION: Optional[str] = None
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     S3_BUCKET: Optional[str] = None
     S3_OBJECT_KEY: str = "today.json"
+    S3_ENDPOINT_URL: Optional[str] = None  # S3-совместимое хранилище (MinIO, localstack); по умолчанию AWS
+    S3_MAX_POOL_CONNECTIONS: int = 10  # соединений в пуле общего S3-клиента
+    SQLITE_PATH: str = "data/predictor.db"  # история снимков по датам (DATA_BACKEND=sqlite)
+    SNAPSHOT_CACHE: bool = True  # держать разобранный снимок в памяти процесса
+    SNAPSHOT_REVALIDATE_S: float = 2.0  # как часто проверять версию снимка в S3/SQLite
+    PAYLOAD_GZIP_LEVEL: int = 9  # сжатие готовых ответов API (один раз на версию снимка)
+    PAYLOAD_BROTLI_QUALITY: int = 11  # нужен пакет brotli, иначе только gzip
 
     TEAMLIST_CSV_URL: str
+    ALIAS_MAP_PATH: str = "data/alias_map.json"  # скомпилированный словарь алиасов
+    ALIAS_MAP_TTL_S: float = 3600.0  # как часто перепроверять таблицу команд
+    NORMALIZE_CACHE_SIZE: int = 4096  # сколько нормализованных названий держать в памяти
+    CONSENSUS_WEIGHTS: Dict[str, float] = {}  # веса источников в консенсусе, напр. {"kenpom": 2.0}; по умолчанию 1
+    FUZZY_MATCH: bool = False  # нечеткий поиск для названий, которых нет в словаре
+    FUZZY_MATCH_THRESHOLD: float = 0.8  # минимальное сходство (коэффициент Дайса по триграммам)
+    FUZZY_MATCH_MARGIN: float = 0.05  # отрыв лучшей команды от второй, иначе не угадываем
+    LEARNED_ALIASES_PATH: str = "data/learned_aliases.csv"  # найденные нечетким поиском алиасы на проверку (approved = 1)
 
     KENPOM_EMAIL: Optional[str] = None
     KENPOM_PASSWORD: Optional[str] = None
     KENPOM_COOKIE: Optional[str] = None
+    KENPOM_SESSION_PATH: str = "data/kenpom_session.json"  # сохраненная сессия KenPom
+    KENPOM_SESSION_TTL_H: float = 12.0  # срок сессии, если cookie не указывают свой
 
     ADMIN_TOKEN: str = "change-me"
 
     USER_AGENT: str = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    HOST_DELAY_MS: int = 2000  # 2s
+    HOST_DELAY_MS: int = 2000  # 2s; базовый темп лимитера - один запрос в HOST_DELAY_MS
+    HOST_BURST: int = 2  # сколько запросов к домену можно сделать без ожидания
+    HOST_RATES: Dict[str, float] = {}  # запросов в секунду по домену, напр. {"kenpom.com": 0.5}
+    HOST_BURSTS: Dict[str, int] = {}  # burst по домену
+
+    # HTTP pool
+    HTTP2: bool = True  # HTTP/2 там, где сервер его поддерживает (нужен пакет h2)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_PER_HOST: int = 4  # одновременных запросов к одному домену
+    HTTP_KEEPALIVE_S: float = 300.0
+    HTTP_WARMUP: bool = True  # прогрев соединений в 11:58 ET
+
+    # HTTP cache (условные GET по ETag / Last-Modified)
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = "data/http_cache"
+    HTTP_CACHE_TTL_S: float = 7 * 24 * 3600  # записи старше удаляются
+    HTTP_CACHE_MAX_MB: int = 50
+
+    # Архив сырых ответов
+    SCRAPER_MODE: str = "live"  # "live" | "record" | "replay"
+    ARCHIVE_DIR: str = "data/archive"
+
+    # Парсинг HTML вне event loop
+    PARSE_EXECUTOR: str = "process"  # "process" | "thread" | "inline"
+    PARSE_WORKERS: int = 2
+
+    # Запасные URL источников
+    URL_STATS_PATH: str = "data/url_stats.json"  # память о рабочих URL
+    URL_HEDGE_DELAY_S: float = 3.0  # через сколько запускать следующий кандидат
+    URL_HEDGE_MAX_PARALLEL: int = 2  # кандидатов одновременно
+    BREAKER_PATH: str = "data/breaker.json"  # состояние предохранителей источников
+    BREAKER_FAILURE_THRESHOLD: int = 3  # неудач подряд до отключения источника
+    BREAKER_COOLDOWN_S: float = 1800.0  # сколько пропускать отключенный источник
+
+    # Обновления в течение дня
+    INTRADAY_REFRESH: bool = True
+    RATINGS_REFRESH_HOURS: str = "9,17"  # cron-часы ET для рейтингов (плюс полный сбор в 12:00)
+    RATINGS_REFRESH_MINUTE: int = 5
+    ODDS_REFRESH_NEAR_MIN: int = 10  # интервал линий у самого tipoff
+    ODDS_REFRESH_FAR_MIN: int = 60  # интервал линий, когда игры далеко
+    ODDS_NEAR_WINDOW_MIN: int = 180  # за сколько минут до tipoff начинаем учащать
+
+    # История линий
+    LINES_DIR: str = "data/lines"
+
+    # Backfill истории
+    BACKFILL_CONCURRENCY: int = 4  # дат одновременно
+    BACKFILL_CHECKPOINT_PATH: str = "data/backfill_checkpoint.json"
+
+    # Ingest
+    INGEST_CONCURRENT: bool = True  # запускать скрейперы параллельно
+    INGEST_STREAMING: bool = False  # прикреплять игры источника сразу после разбора его страницы (stream_today)
+    SOURCE_TIMEOUT_S: float = 120.0  # дедлайн одного источника
+    SOURCE_TIMEOUTS: Dict[str, float] = {}  # переопределения по источнику, напр. {"kenpom": 180}
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import re
+import sqlite3
+import time
+from typing import List, Optional
+from .models import PredictorRow, Snapshot, SourceMetrics
+from .merger import row_keys, CONSENSUS_FIELDS
+from .settings import settings
+
+SOURCES = ["kenpom", "bart", "massey", "hasla", "odds"]
+
+# Колонки метрик: поле SourceMetrics -> колонка таблицы
+METRIC_COLUMNS = {
+    "spread": "spread",
+    "total": "total",
+    "winProbHome": "win_prob_home",
+    "projHome": "proj_home",
+    "projAway": "proj_away",
+    "moneylineHome": "moneyline_home",
+    "moneylineAway": "moneyline_away",
+}
+
+# Поля консенсуса PredictorRow -> колонки games (avgSpread -> avg_spread)
+STAT_COLUMNS = {field: re.sub(r"(?<!^)(?=[A-Z])", "_", field).lower() for field in CONSENSUS_FIELDS}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    et_date TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    stale_sources TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS games (
+    et_date TEXT NOT NULL,
+    game_key TEXT NOT NULL,
+    tipoff_et TEXT,
+    neutral INTEGER NOT NULL,
+    away_team TEXT NOT NULL,
+    home_team TEXT NOT NULL,
+    avg_spread REAL,
+    avg_total REAL,
+    avg_win_prob_home REAL,
+    PRIMARY KEY (et_date, game_key)
+);
+CREATE INDEX IF NOT EXISTS games_home_team ON games (home_team, et_date);
+CREATE INDEX IF NOT EXISTS games_away_team ON games (away_team, et_date);
+CREATE TABLE IF NOT EXISTS game_sources (
+    et_date TEXT NOT NULL,
+    game_key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    spread REAL,
+    total REAL,
+    win_prob_home REAL,
+    proj_home REAL,
+    proj_away REAL,
+    moneyline_home INTEGER,
+    moneyline_away INTEGER,
+    PRIMARY KEY (et_date, game_key, source)
+);
+CREATE INDEX IF NOT EXISTS game_sources_source ON game_sources (source, et_date);
+"""
+
+# Колонки, добавленные после первой версии схемы: таблица -> {колонка: определение}
+MIGRATIONS = {
+    "snapshots": {"stale_sources": "TEXT NOT NULL DEFAULT ''"},
+    # Статистики консенсуса сверх avg_* из первой версии схемы
+    "games": {
+        column: "INTEGER NOT NULL DEFAULT 0" if field == "sourceCount" else "REAL"
+        for field, column in STAT_COLUMNS.items()
+        if not column.startswith("avg_")
+    },
+}
+
+_initialized = False
+
+def _migrate(conn: sqlite3.Connection):
+    """Добавление недостающих колонок в базы, созданные старой схемой"""
+    for table, columns in MIGRATIONS.items():
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for column, definition in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    directory = os.path.dirname(settings.SQLITE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(settings.SQLITE_PATH)
+    conn.row_factory = sqlite3.Row
+    if not _initialized:
+        # WAL: читатели не блокируются на время записи снимка
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        _initialized = True
+    return conn
+
+def _save(snap: Snapshot):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM game_sources WHERE et_date = ?", (snap.etDate,))
+            conn.execute("DELETE FROM games WHERE et_date = ?", (snap.etDate,))
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (et_date, status, saved_at, stale_sources) VALUES (?, ?, ?, ?)",
+                (snap.etDate, snap.status, time.time(), ",".join(snap.staleSources))
+            )
+            games = []
+            sources = []
+            for row, key in zip(snap.rows, row_keys(snap.rows)):
+                games.append((
+                    snap.etDate, key, row.tipoffET, int(row.neutral), row.awayTeam, row.homeTeam,
+                    *(getattr(row, field) for field in STAT_COLUMNS)
+                ))
+                for source in SOURCES:
+                    metrics = getattr(row, source)
+                    if metrics is not None:
+                        sources.append((snap.etDate, key, source,
+                                        *(getattr(metrics, field) for field in METRIC_COLUMNS)))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO games (et_date, game_key, tipoff_et, neutral, away_team, home_team, "
+                f"{', '.join(STAT_COLUMNS.values())}) VALUES ({', '.join('?' * (6 + len(STAT_COLUMNS)))})",
+                games
+            )
+            conn.executemany(
+                f"INSERT OR REPLACE INTO game_sources (et_date, game_key, source, "
+                f"{', '.join(METRIC_COLUMNS.values())}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                sources
+            )
+    finally:
+        conn.close()
+
+def _rows(conn: sqlite3.Connection, where: str, params: tuple) -> List[PredictorRow]:
+    """Сборка PredictorRow из игр, отобранных условием where"""
+    games = conn.execute(
+        f"SELECT * FROM games g WHERE {where} ORDER BY g.et_date, g.tipoff_et, g.game_key", params
+    ).fetchall()
+    if not games:
+        return []
+
+    metrics = {}
+    for m in conn.execute(
+        f"SELECT s.* FROM game_sources s JOIN games g "
+        f"ON g.et_date = s.et_date AND g.game_key = s.game_key WHERE {where}", params
+    ):
+        metrics.setdefault((m["et_date"], m["game_key"]), {})[m["source"]] = SourceMetrics(
+            **{field: m[column] for field, column in METRIC_COLUMNS.items()}
+        )
+
+    rows = []
+    for g in games:
+        row = PredictorRow(
+            dateISO=g["et_date"],
+            tipoffET=g["tipoff_et"],
+            neutral=bool(g["neutral"]),
+            awayTeam=g["away_team"],
+            homeTeam=g["home_team"],
+            **{field: g[column] for field, column in STAT_COLUMNS.items()},
+            **metrics.get((g["et_date"], g["game_key"]), {})
+        )
+        rows.append(row)
+    return rows
+
+def _load(et_date: Optional[str]) -> Optional[Snapshot]:
+    conn = _connect()
+    try:
+        if et_date is None:
+            snap = conn.execute("SELECT * FROM snapshots ORDER BY et_date DESC LIMIT 1").fetchone()
+        else:
+            snap = conn.execute("SELECT * FROM snapshots WHERE et_date = ?", (et_date,)).fetchone()
+        if snap is None:
+            return None
+        rows = _rows(conn, "g.et_date = ?", (snap["et_date"],))
+        stale_sources = [s for s in snap["stale_sources"].split(",") if s]
+        return Snapshot(status=snap["status"], etDate=snap["et_date"], rows=rows, staleSources=stale_sources)
+    finally:
+        conn.close()
+
+def _query(date_from: str, date_to: str, team: Optional[str], source: Optional[str]) -> List[PredictorRow]:
+    where = "g.et_date BETWEEN ? AND ?"
+    params = [date_from, date_to]
+    if team:
+        where += " AND (g.home_team = ? OR g.away_team = ?)"
+        params += [team, team]
+    if source:
+        where += (" AND EXISTS (SELECT 1 FROM game_sources x WHERE x.et_date = g.et_date "
+                  "AND x.game_key = g.game_key AND x.source = ?)")
+        params.append(source)
+    conn = _connect()
+    try:
+        return _rows(conn, where, tuple(params))
+    finally:
+        conn.close()
+
+def _latest_version() -> Optional[tuple]:
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT et_date, saved_at FROM snapshots ORDER BY et_date DESC LIMIT 1").fetchone()
+        return (row["et_date"], row["saved_at"]) if row else None
+    finally:
+        conn.close()
+
+def _dates() -> List[str]:
+    conn = _connect()
+    try:
+        return [r["et_date"] for r in conn.execute("SELECT et_date FROM snapshots ORDER BY et_date")]
+    finally:
+        conn.close()
+
+async def save_snapshot(snap: Snapshot):
+    """Сохранение снимка за его etDate (заменяет прежний снимок за эту дату)"""
+    await asyncio.to_thread(_save, snap)
+
+async def load_snapshot(et_date: Optional[str] = None) -> Optional[Snapshot]:
+    """Снимок за дату; без даты - самый свежий"""
+    return await asyncio.to_thread(_load, et_date)
+
+async def query_games(date_from: str, date_to: str, team: Optional[str] = None,
+                      source: Optional[str] = None) -> List[PredictorRow]:
+    """Игры за диапазон дат, опционально по команде и по наличию данных источника"""
+    return await asyncio.to_thread(_query, date_from, date_to, team, source)
+
+async def latest_version() -> Optional[tuple]:
+    """Дата и время записи самого свежего снимка (для проверки кеша)"""
+    return await asyncio.to_thread(_latest_version)
+
+async def snapshot_dates() -> List[str]:
+    """Даты, за которые есть снимки"""
+    return await asyncio.to_thread(_dates)
@@ -1,72 +1,196 @@
+import asyncio
 import json
 import os
-import aioboto3
+import time
+from typing import Any, Optional, Tuple
+from botocore.exceptions import ClientError
 from .models import Snapshot
 from .settings import settings
+from .s3 import get_s3_client, s3_configured
+from . import sqlite_store
+
+try:
+    # orjson + model_validate разбирает снимок быстрее model_validate_json
+    import orjson
+except ImportError:
+    orjson = None
 
 LOCAL_PATH = "data/today.json"
 
+class SnapshotCache:
+    """Последний снимок в памяти процесса
+
+    Снимок разбирается один раз на версию. Версия - mtime и размер файла,
+    ETag объекта S3 или время записи в SQLite. save_snapshot в этом процессе
+    обновляет кеш сразу; записи других процессов (воркеры, скрипты) замечаются
+    по смене версии: для файла stat на каждое чтение, для S3 (условный GET)
+    и SQLite - не чаще раза в SNAPSHOT_REVALIDATE_S.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[Snapshot] = None
+        self._version: Any = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Optional[Snapshot]:
+        if not settings.SNAPSHOT_CACHE:
+            return await _load()
+        
+        now = time.monotonic()
+        if (self._loaded and settings.DATA_BACKEND != "local"
+                and now - self._checked_at < settings.SNAPSHOT_REVALIDATE_S):
+            return self._snapshot
+        
+        if settings.DATA_BACKEND == "s3":
+            return await self._revalidate_s3()
+        
+        version = await _version()
+        self._checked_at = now
+        if self._loaded and version == self._version:
+            return self._snapshot
+        if self._loaded and version is None and settings.DATA_BACKEND != "local":
+            # SQLite временно недоступна - отдаем то, что есть
+            return self._snapshot
+        
+        # Перечитываем один раз, даже если версию сменили сразу много запросов
+        async with self._lock:
+            if not (self._loaded and version == self._version):
+                self._snapshot = await _load()
+                self._version = version
+                self._loaded = True
+        return self._snapshot
+
+    async def _revalidate_s3(self) -> Optional[Snapshot]:
+        """Условный GET по ETag: неизмененный объект стоит один ответ 304 без тела"""
+        async with self._lock:
+            # Пока ждали, версию мог проверить другой запрос
+            if self._loaded and time.monotonic() - self._checked_at < settings.SNAPSHOT_REVALIDATE_S:
+                return self._snapshot
+            changed, snap, etag = await _fetch_from_s3(self._version if self._loaded else None)
+            self._checked_at = time.monotonic()
+            if changed:
+                self._snapshot = snap
+                self._version = etag
+                self._loaded = True
+            # Не изменился или S3 временно недоступен - отдаем то, что есть
+        return self._snapshot
+
+    async def put(self, snap: Snapshot, version: Any = None):
+        """Снимок, только что записанный этим процессом"""
+        self._snapshot = snap
+        self._version = version if version is not None else await _version()
+        self._loaded = True
+        self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        self._loaded = False
+
+snapshot_cache = SnapshotCache()
+
+def dump_snapshot(snap: Snapshot) -> bytes:
+    """Компактный JSON снимка: без отступов и без полей None (у всех них None - значение по умолчанию)"""
+    return snap.model_dump_json(exclude_none=True).encode("utf-8")
+
+def parse_snapshot(data: bytes | str) -> Snapshot:
+    """Снимок из JSON (читает и компактный, и прежний формат с отступами)"""
+    if orjson is not None:
+        return Snapshot.model_validate(orjson.loads(data))
+    return Snapshot.model_validate_json(data)
+
 async def load_snapshot() -> Snapshot | None:
-    """Загрузка снимка данных"""
+    """Загрузка снимка данных (из кеша процесса, см. SnapshotCache)"""
+    return await snapshot_cache.get()
+
+async def _version() -> Any:
+    """Дешевый признак изменения снимка в хранилище (для S3 - ETag из условного GET)"""
+    try:
+        if settings.DATA_BACKEND == "sqlite":
+            return await sqlite_store.latest_version()
+        else:
+            st = os.stat(LOCAL_PATH)
+            return (st.st_mtime_ns, st.st_size)
+    except Exception:
+        # Нет файла/объекта или хранилище недоступно - версия неизвестна
+        return None
+
+async def _load() -> Snapshot | None:
     if settings.DATA_BACKEND == "s3":
         return await _load_from_s3()
+    elif settings.DATA_BACKEND == "sqlite":
+        # Самый свежий снимок (за сегодня) из истории
+        return await sqlite_store.load_snapshot()
     else:
         return await _load_from_local()
 
 async def save_snapshot(snap: Snapshot):
     """Сохранение снимка данных"""
-    data = snap.model_dump_json(indent=2)
+    if settings.DATA_BACKEND == "sqlite":
+        await sqlite_store.save_snapshot(snap)
+        # В кеше - самый свежий снимок, а сохранять можно и прошедшую дату
+        snapshot_cache.invalidate()
+        return
+    
+    data = dump_snapshot(snap)
     
     if settings.DATA_BACKEND == "s3":
-        await _save_to_s3(data)
+        etag = await _save_to_s3(data)
+        await snapshot_cache.put(snap, etag)
     else:
         await _save_to_local(data)
+        await snapshot_cache.put(snap)
 
 async def _load_from_s3() -> Snapshot | None:
     """Загрузка из S3"""
-    if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.S3_BUCKET]):
+    _, snap, _ = await _fetch_from_s3()
+    return snap
+
+async def _fetch_from_s3(etag: Optional[str] = None) -> Tuple[bool, Optional[Snapshot], Optional[str]]:
+    """Чтение снимка из S3: (изменился ли, снимок, ETag)
+
+    С etag запрос условный (If-None-Match): если объект тот же, S3 отвечает
+    304 без тела. Ошибка чтения считается "не изменился", чтобы кеш отдавал
+    последнюю удачную версию.
+    """
+    if not s3_configured():
         print("S3 credentials not configured")
-        return None
+        return False, None, None
     
+    params = {"Bucket": settings.S3_BUCKET, "Key": settings.S3_OBJECT_KEY}
+    if etag:
+        params["IfNoneMatch"] = etag
     try:
-        session = aioboto3.Session(
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION,
-        )
-        
-        async with session.client("s3") as s3:
-            obj = await s3.get_object(
-                Bucket=settings.S3_BUCKET, 
-                Key=settings.S3_OBJECT_KEY
-            )
-            data = await obj["Body"].read()
-            return Snapshot.model_validate_json(data)
-            
+        s3 = await get_s3_client()
+        obj = await s3.get_object(**params)
+        data = await obj["Body"].read()
+        return True, parse_snapshot(data), obj.get("ETag")
+    except ClientError as e:
+        if e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 304:
+            return False, None, etag
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return True, None, None
+        print(f"Error loading from S3: {e}")
+        return False, None, None
     except Exception as e:
         print(f"Error loading from S3: {e}")
-        return None
+        return False, None, None
 
-async def _save_to_s3(data: str):
-    """Сохранение в S3"""
-    if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.S3_BUCKET]):
+async def _save_to_s3(data: bytes) -> Optional[str]:
+    """Сохранение в S3, возвращает ETag записанного объекта"""
+    if not s3_configured():
         print("S3 credentials not configured")
-        return
+        return None
     
     try:
-        session = aioboto3.Session(
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION,
+        s3 = await get_s3_client()
+        result = await s3.put_object(
+            Bucket=settings.S3_BUCKET,
+            Key=settings.S3_OBJECT_KEY,
+            Body=data,
+            ContentType="application/json"
         )
-        
-        async with session.client("s3") as s3:
-            await s3.put_object(
-                Bucket=settings.S3_BUCKET,
-                Key=settings.S3_OBJECT_KEY,
-                Body=data.encode("utf-8"),
-                ContentType="application/json"
-            )
+        return result.get("ETag")
             
     except Exception as e:
         print(f"Error saving to S3: {e}")
@@ -78,20 +202,49 @@ async def _load_from_local() -> Snapshot | None:
         return None
     
     try:
-        with open(LOCAL_PATH, "r", encoding="utf-8") as f:
-            data = f.read()
-            return Snapshot.model_validate_json(data)
+        with open(LOCAL_PATH, "rb") as f:
+            return parse_snapshot(f.read())
     except Exception as e:
         print(f"Error loading from local file: {e}")
         return None
 
-async def _save_to_local(data: str):
+def write_atomic(path: str, data: bytes):
+    """Запись файла целиком или никак: временный файл, fsync, rename
+
+    Читатель видит либо прежнюю версию, либо новую, но не обрезанный JSON;
+    после сбоя питания на диске тоже остается одна из двух версий.
+    """
+    directory = os.path.dirname(path) or "."
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Сам rename тоже должен попасть на диск
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # Каталог так не открыть (Windows) - rename уже атомарен
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+async def _save_to_local(data: bytes):
     """Сохранение в локальный файл"""
     os.makedirs("data", exist_ok=True)
     
     try:
-        with open(LOCAL_PATH, "w", encoding="utf-8") as f:
-            f.write(data)
+        write_atomic(LOCAL_PATH, data)
     except Exception as e:
         print(f"Error saving to local file: {e}")
         raise
@@ -1,11 +1,23 @@
-from datetime import datetime
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 from dateutil import tz
 from .settings import settings
 from .models import Snapshot
-from .storage import save_snapshot
-from .normalizer import load_alias_map, canon_name
-from .merger import attach, finalize
+from .storage import save_snapshot, load_snapshot
+from .normalizer import load_alias_map, canon_name, canon_names
+from .merger import GameIndex, GameRecord, attach, finalize, row_keys
+from .scrapers.ratelimit import rate_limiter
+from .scrapers.httpcache import http_cache
+from .loop_monitor import ingest_loop_monitor
+from .breaker import circuit_breaker
+from .fuzzy import learned_aliases
+from .lines import line_store
+from . import sqlite_store
 from .scrapers import (
+    Scraper,
+    RawGame,
     KenPomScraper,
     BartScraper,
     MasseyScraper,
@@ -13,14 +25,207 @@ from .scrapers import (
     TeamRankingsScraper
 )
 
+# Реестр скрейперов: колонка снимка -> класс скрейпера
+SCRAPERS: Dict[str, Type[Scraper]] = {
+    "kenpom": KenPomScraper,
+    "bart": BartScraper,
+    "massey": MasseyScraper,
+    "hasla": HaslaScraper,
+    "odds": TeamRankingsScraper,
+}
+
+# Полный сбор и точечные обновления источников не должны писать снимок одновременно
+_snapshot_lock = asyncio.Lock()
+
+# Согласования ориентации игр между источниками за последний сбор (см. GameIndex)
+last_reconciliations: List[dict] = []
+
+def et_today() -> str:
+    """Сегодняшняя дата в ET (YYYY-MM-DD)"""
+    now_utc = datetime.utcnow().replace(tzinfo=tz.UTC)
+    now_et = now_utc.astimezone(tz.gettz("America/New_York"))
+    return now_et.strftime("%Y-%m-%d")
+
+def _source_timeout(name: str) -> float:
+    """Дедлайн источника в секундах"""
+    return settings.SOURCE_TIMEOUTS.get(name, settings.SOURCE_TIMEOUT_S)
+
+async def _fetch_source(name: str, day: Optional[date] = None) -> List[RawGame]:
+    """Запуск одного скрейпера с собственным дедлайном (day - игры за прошедшую дату)"""
+    print(f"Running {name} scraper{f' for {day}' if day else ''}...")
+    async with SCRAPERS[name]() as scraper:
+        fetch = scraper.fetch_date(day) if day else scraper.fetch_today()
+        # wait_for отменяет загрузку при превышении дедлайна
+        return await asyncio.wait_for(fetch, timeout=_source_timeout(name))
+
+async def _stream_source(name: str, rows_map: Dict, et_date_str: str,
+                         alias_map: Dict[str, str]) -> int:
+    """Потоковый запуск скрейпера: каждая игра прикрепляется сразу после разбора строки"""
+    print(f"Running {name} scraper (streaming)...")
+    
+    async def consume() -> int:
+        count = 0
+        async with SCRAPERS[name]() as scraper:
+            async for rg in scraper.stream_today():
+                count += _attach_game(rows_map, name, rg, et_date_str, alias_map)
+        return count
+    
+    # При превышении дедлайна уже прикрепленные игры остаются в rows_map,
+    # _ingest_today убирает их вместе со всей колонкой упавшего источника
+    return await asyncio.wait_for(consume(), timeout=_source_timeout(name))
+
+def _attach_game(rows_map: Dict, name: str, rg: RawGame,
+                 et_date_str: str, alias_map: Dict[str, str]) -> bool:
+    """Нормализация и прикрепление одной игры, True - игра на сегодня"""
+    # Проверяем что игра на сегодня
+    if rg.date.strftime("%Y-%m-%d") != et_date_str:
+        return False
+    
+    # Нормализуем названия команд
+    home = canon_name(rg.home, alias_map, name)
+    away = canon_name(rg.away, alias_map, name)
+    
+    if not home or not away:
+        print(f"Skipping game {rg.away} @ {rg.home} - teams not found in alias map")
+        return True
+    
+    # Прикрепляем метрики к игре
+    attach(rows_map, et_date_str, rg.tipoff_et, rg.neutral, home, away, name, rg.metrics)
+    return True
+
+def _attach_games(rows_map: Dict, name: str, raw_list: List[RawGame],
+                  et_date_str: str, alias_map: Dict[str, str]) -> int:
+    """Нормализация и прикрепление игр источника, возвращает число игр на сегодня"""
+    games = [rg for rg in raw_list if rg.date.strftime("%Y-%m-%d") == et_date_str]
+    # Названия всего источника нормализуем одним пакетом
+    canon = canon_names([team for rg in games for team in (rg.home, rg.away)], alias_map, name)
+    for rg, home, away in zip(games, canon[0::2], canon[1::2]):
+        if not home or not away:
+            print(f"Skipping game {rg.away} @ {rg.home} - teams not found in alias map")
+            continue
+        attach(rows_map, et_date_str, rg.tipoff_et, rg.neutral, home, away, name, rg.metrics)
+    return len(games)
+
+def _record_lines(et_date_str: str, games, sources):
+    """Дописать текущие метрики источников в историю линий (games - пары ключ, строка)"""
+    try:
+        count = line_store.append(et_date_str, (
+            (key, source, getattr(row, source))
+            for key, row in games
+            for source in sources
+            if getattr(row, source) is not None
+        ))
+        print(f"Recorded {count} line observations")
+    except Exception as e:
+        # История линий не должна ломать публикацию снимка
+        print(f"Error recording line history: {e}")
+
+def _report_reconciliations(rows_map: GameIndex):
+    """Печать и сохранение согласований ориентации игр"""
+    last_reconciliations[:] = rows_map.reconciliations
+    for r in rows_map.reconciliations:
+        print(f"Reconciled {r['source']} game {r['reported']} -> {r['game']} "
+              f"(flipped={r['flipped']}, neutral mismatch={r['neutralMismatch']}, reoriented={r['reoriented']})")
+
+def _source_error(name: str, e: Exception) -> str:
+    if isinstance(e, asyncio.TimeoutError):
+        return f"{name} scraper timed out after {_source_timeout(name):g}s"
+    return f"{name} scraper failed: {str(e)}"
+
+def _fill_stale(rows_map: Dict, previous: Optional[Snapshot], names: Iterable[str]) -> List[str]:
+    """Подстановка последних успешных метрик источников из прежнего снимка за сегодня
+
+    Возвращает источники, для которых нашлись данные.
+    """
+    filled = []
+    if not previous:
+        return filled
+    for name in names:
+        found = False
+        for row in previous.rows:
+            metrics = getattr(row, name)
+            if metrics is None:
+                continue
+            attach(rows_map, row.dateISO, row.tipoffET, row.neutral,
+                   row.homeTeam, row.awayTeam, name, metrics.model_dump())
+            found = True
+        if found:
+            filled.append(name)
+    return filled
+
+async def _run_sequential(rows_map: Dict, errors: List[str], et_date_str: str,
+                          alias_map: Dict[str, str], names: Iterable[str] = SCRAPERS) -> List[str]:
+    """Последовательный запуск скрейперов, возвращает упавшие источники"""
+    failed = []
+    for name in names:
+        try:
+            if settings.INGEST_STREAMING:
+                count = await _stream_source(name, rows_map, et_date_str, alias_map)
+            else:
+                raw_list = await _fetch_source(name)
+                count = _attach_games(rows_map, name, raw_list, et_date_str, alias_map)
+            print(f"{name} scraper completed: {count} games")
+        except Exception as e:
+            error_msg = _source_error(name, e)
+            print(error_msg)
+            errors.append(error_msg)
+            failed.append(name)
+    return failed
+
+async def _run_concurrent(rows_map: Dict, errors: List[str], et_date_str: str,
+                          alias_map: Dict[str, str], names: Iterable[str] = SCRAPERS,
+                          day: Optional[date] = None) -> List[str]:
+    """Параллельный запуск скрейперов: результаты прикрепляются по мере готовности
+
+    Возвращает упавшие источники.
+    """
+    started = time.monotonic()
+    failed = []
+    # Потоковый режим только для сегодняшних страниц: игры прикрепляются прямо в задачах
+    streaming = settings.INGEST_STREAMING and day is None
+    pending = {
+        asyncio.create_task(
+            _stream_source(name, rows_map, et_date_str, alias_map) if streaming
+            else _fetch_source(name, day)
+        ): name
+        for name in names
+    }
+    
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                elapsed = time.monotonic() - started
+                try:
+                    result = task.result()
+                except Exception as e:
+                    error_msg = _source_error(name, e)
+                    print(error_msg)
+                    errors.append(error_msg)
+                    failed.append(name)
+                    continue
+                count = result if streaming else _attach_games(rows_map, name, result, et_date_str, alias_map)
+                print(f"{name} scraper completed: {count} games ({elapsed:.1f}s)")
+    finally:
+        # Если сам ingest отменили, не оставляем висящих задач
+        for task in pending:
+            task.cancel()
+    return failed
+
 async def ingest_today():
     """Основная задача сбора данных за сегодня"""
+    async with _snapshot_lock:
+        await _ingest_today()
+
+async def _ingest_today():
     print("Starting daily ingest...")
+    ingest_started = time.monotonic()
+    throttled_before = rate_limiter.stats()
+    learned_aliases.reset_report()
     
     # Рассчитываем «сегодня» в ET
-    now_utc = datetime.utcnow().replace(tzinfo=tz.UTC)
-    now_et = now_utc.astimezone(tz.gettz("America/New_York"))
-    et_date_str = now_et.strftime("%Y-%m-%d")
+    et_date_str = et_today()
     
     print(f"Processing games for {et_date_str} (ET)")
     
@@ -35,48 +240,54 @@ async def ingest_today():
         await save_snapshot(snap)
         return
     
-    # Инициализируем только реальные скрейперы
-    scrapers = [
-        ("kenpom", KenPomScraper()),
-        ("bart", BartScraper()),
-        ("massey", MasseyScraper()),
-        ("hasla", HaslaScraper()),
-        ("odds", TeamRankingsScraper()),
-    ]
-    
-    rows_map = {}
+    rows_map = GameIndex()
     errors = []
     
-    # Запускаем все скрейперы
-    for name, scraper in scrapers:
-        try:
-            print(f"Running {name} scraper...")
-            async with scraper:
-                raw_list = await scraper.fetch_today()
-                
-                for rg in raw_list:
-                    # Проверяем что игра на сегодня
-                    if rg.date.strftime("%Y-%m-%d") != et_date_str:
-                        continue
-                    
-                    # Нормализуем названия команд
-                    home = canon_name(rg.home, alias_map)
-                    away = canon_name(rg.away, alias_map)
-                    
-                    if not home or not away:
-                        print(f"Skipping game {rg.away} @ {rg.home} - teams not found in alias map")
-                        continue
-                    
-                    # Прикрепляем метрики к игре
-                    attach(rows_map, et_date_str, rg.tipoff_et, rg.neutral, home, away, name, rg.metrics)
-                
-                print(f"{name} scraper completed: {len([rg for rg in raw_list if rg.date.strftime('%Y-%m-%d') == et_date_str])} games")
-                
-        except Exception as e:
-            error_msg = f"{name} scraper failed: {str(e)}"
-            print(error_msg)
-            errors.append(error_msg)
-            continue
+    # Источники с открытым предохранителем не запускаем
+    names = [name for name in SCRAPERS if circuit_breaker.allow(name)]
+    skipped = [name for name in SCRAPERS if name not in names]
+    if skipped:
+        print(f"Circuit breaker open, skipping: {skipped}")
+    
+    async with ingest_loop_monitor.measure():
+        if settings.INGEST_CONCURRENT:
+            failed = await _run_concurrent(rows_map, errors, et_date_str, alias_map, names=names)
+        else:
+            failed = await _run_sequential(rows_map, errors, et_date_str, alias_map, names=names)
+    
+    for name in names:
+        if name in failed:
+            circuit_breaker.record_failure(name, next(e for e in errors if e.startswith(name)))
+        else:
+            circuit_breaker.record_success(name)
+    circuit_breaker.save()
+    
+    # Упавший потоковый источник мог успеть прикрепить часть игр - колонка
+    # должна быть целиком либо свежей, либо из прежнего снимка
+    for name in failed:
+        rows_map.clear_source(name)
+    
+    # Для пропущенных и упавших источников берем последние успешные данные за сегодня
+    stale_sources = []
+    if skipped or failed:
+        previous = await load_snapshot()
+        if previous and previous.etDate == et_date_str:
+            stale_sources = _fill_stale(rows_map, previous, skipped + failed)
+        if stale_sources:
+            print(f"Using last good data for: {stale_sources}")
+    _report_reconciliations(rows_map)
+
+    throttled = {
+        host: round(waited - throttled_before.get(host, 0.0), 3)
+        for host, waited in rate_limiter.stats().items()
+    }
+    print(f"Rate limiter waits by host (s): {throttled}")
+    print(f"HTTP cache hits/misses by source: {http_cache.stats()}")
+    print(f"Event loop blocked during scraping: {ingest_loop_monitor.stats()}")
+    learned_aliases.save()
+    recovered = learned_aliases.report()
+    if recovered:
+        print(f"Recovered {sum(e['rows'] for e in recovered)} team names by fuzzy match: {recovered}")
 
     # Проверяем, получили ли мы данные от реальных скрейперов
     if not rows_map:
@@ -97,7 +308,100 @@ async def ingest_today():
         rows, status = [], "stale"
     
     # Сохраняем снимок
-    snap = Snapshot(status=status, etDate=et_date_str, rows=rows)
+    snap = Snapshot(status=status, etDate=et_date_str, rows=rows, staleSources=stale_sources)
     await save_snapshot(snap)
+    # Подставленные старые данные - не новые наблюдения линий
+    _record_lines(et_date_str, zip(row_keys(rows), rows), [name for name in SCRAPERS if name not in stale_sources])
     
-    print(f"Daily ingest completed. Status: {status}, Games: {len(rows)}")
+    print(f"Daily ingest completed. Status: {status}, Games: {len(rows)}, "
+          f"took {time.monotonic() - ingest_started:.1f}s")
+
+async def refresh_source(name: str):
+    """Обновление колонок одного источника в снимке за сегодня
+
+    Остальные источники не трогаем; средние пересчитываются только
+    для игр, где данные этого источника появились или пропали.
+    Если снимка за сегодня еще нет, обновление пропускается: полный сбор
+    делает только daily_ingest. Пустой ответ источника, у которого в снимке
+    уже есть игры, считается сбоем: прежняя колонка остается.
+    """
+    if not circuit_breaker.allow(name):
+        print(f"Circuit breaker open, skipping {name} refresh")
+        return
+    
+    async with _snapshot_lock:
+        # Снимок читаем под блокировкой: его мог обновить параллельный сбор
+        et_date_str = et_today()
+        snap = await load_snapshot()
+        if not snap or snap.etDate != et_date_str:
+            print(f"No snapshot for {et_date_str} yet, skipping {name} refresh")
+            return
+        try:
+            alias_map = await load_alias_map(settings.TEAMLIST_CSV_URL)
+            raw_list = await _fetch_source(name)
+            had_games = any(getattr(row, name) is not None for row in snap.rows)
+            if had_games and not any(rg.date.strftime("%Y-%m-%d") == et_date_str for rg in raw_list):
+                # Игры дня не пропадают - это сбой страницы, а не пустой слейт
+                raise RuntimeError("no games for today, keeping previous data")
+        except Exception as e:
+            # Оставляем прежние данные источника как есть
+            error_msg = _source_error(name, e)
+            print(error_msg)
+            circuit_breaker.record_failure(name, error_msg)
+            circuit_breaker.save()
+            return
+        circuit_breaker.record_success(name)
+        circuit_breaker.save()
+        
+        published = dict(zip(row_keys(snap.rows), snap.rows))
+        rows_map = GameIndex({key: GameRecord.from_row(row) for key, row in published.items()})
+        previous = {key for key, rec in rows_map.items() if getattr(rec, name) is not None}
+        for rec in rows_map.values():
+            setattr(rec, name, None)
+        
+        count = _attach_games(rows_map, name, raw_list, et_date_str, alias_map)
+        learned_aliases.save()
+        _report_reconciliations(rows_map)
+        current = {key for key, rec in rows_map.items() if getattr(rec, name) is not None}
+        affected = [key for key in rows_map if key in previous or key in current]
+        published.update(zip(affected, finalize({key: rows_map[key] for key in affected})))
+        
+        stale_sources = [source for source in snap.staleSources if source != name]
+        snap = Snapshot(status=snap.status, etDate=et_date_str, rows=list(published.values()),
+                        staleSources=stale_sources)
+        await save_snapshot(snap)
+        _record_lines(et_date_str, ((key, published[key]) for key in current), [name])
+        print(f"{name} refresh completed: {count} games, {len(affected)} rows updated")
+
+def history_sources(names: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Разделение источников на умеющие и не умеющие отдавать игры за прошедшие даты"""
+    supported, unsupported = [], []
+    for name in names:
+        (supported if SCRAPERS[name].supports_history() else unsupported).append(name)
+    return supported, unsupported
+
+async def ingest_date(day: date, names: List[str], alias_map: Dict[str, str]) -> Tuple[Snapshot, List[str]]:
+    """Сбор снимка за прошедшую дату из указанных источников
+
+    Колонки остальных источников берутся из уже сохраненного в истории снимка за эту дату.
+    Если источник упал, его сохраненные ранее данные тоже остаются.
+    """
+    et_date_str = day.strftime("%Y-%m-%d")
+    rows_map = GameIndex()
+    existing = await sqlite_store.load_snapshot(et_date_str)
+    if existing:
+        for row in existing.rows:
+            rec = GameRecord.from_row(row)
+            for name in names:
+                setattr(rec, name, None)
+            rows_map.add(rec)
+    
+    errors = []
+    failed = await _run_concurrent(rows_map, errors, et_date_str, alias_map, names=names, day=day)
+    if failed:
+        # Колонки упавших источников очищены выше - возвращаем сохраненные значения
+        _fill_stale(rows_map, existing, failed)
+    learned_aliases.save()
+    rows = finalize(rows_map)
+    status = "ok" if rows and not errors else "stale"
+    return Snapshot(status=status, etDate=et_date_str, rows=rows), errors
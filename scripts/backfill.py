@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Скрипт для сбора истории снимков за диапазон дат
+
+Пишет по одному снимку на дату в историю SQLite (SQLITE_PATH).
+Прогресс сохраняется в checkpoint-файл: прерванный запуск можно просто повторить.
+
+Примеры:
+    python scripts/backfill.py --from 2024-11-04 --to 2025-04-07
+    python scripts/backfill.py --from 2025-01-01 --to 2025-01-31 --source kenpom --source bart
+"""
+import argparse
+import asyncio
+import sys
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+from app.backfill import backfill
+from app.scrapers.pool import close_client_pool
+
+def parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+async def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Backfill historical snapshots")
+    parser.add_argument("--from", dest="date_from", type=parse_date, required=True, help="Начальная дата YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=parse_date, required=True, help="Конечная дата YYYY-MM-DD")
+    parser.add_argument("--source", action="append", help="Колонка источника (kenpom, bart, massey, hasla, odds)")
+    parser.add_argument("--concurrency", type=int, help="Сколько дат собирать одновременно")
+    parser.add_argument("--checkpoint", help="Путь к checkpoint-файлу")
+    args = parser.parse_args()
+
+    try:
+        summary = await backfill(args.date_from, args.date_to, args.source, args.checkpoint, args.concurrency)
+    finally:
+        await close_client_pool()
+
+    if summary["failed"]:
+        print(f"❌ {len(summary['failed'])} dates failed, rerun to retry them")
+        sys.exit(1)
+    print("✅ Backfill completed successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк консенсуса источников (merger.finalize) на синтетических играх
+
+"До" - прежний цикл по играм со statistics.mean (только средние),
+"после" - колоночная таблица NumPy: среднее, медиана, stdev, min/max,
+взвешенное среднее и число источников за один проход.
+
+Примеры:
+    python scripts/bench_consensus.py
+    python scripts/bench_consensus.py --games 1000 10000 50000
+"""
+import argparse
+import random
+import sys
+import os
+import time
+from statistics import mean
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app.merger import GameRecord, finalize, CONSENSUS_SOURCES
+from app.models import PredictorRow, SourceMetrics
+
+def legacy_finalize(rows):
+    """Прежняя реализация (для сравнения)"""
+    out = []
+    for pr in rows.values():
+        spreads, totals, win_probs = [], [], []
+        for source in ["kenpom", "bart", "massey", "hasla"]:
+            metrics = getattr(pr, source)
+            if metrics:
+                if metrics.spread is not None:
+                    spreads.append(metrics.spread)
+                if metrics.total is not None:
+                    totals.append(metrics.total)
+                if metrics.winProbHome is not None:
+                    win_probs.append(metrics.winProbHome)
+        pr.avgSpread = mean(spreads) if spreads else None
+        pr.avgTotal = mean(totals) if totals else None
+        pr.avgWinProbHome = mean(win_probs) if win_probs else None
+        out.append(pr)
+    return out
+
+def make_rows(n: int):
+    """n игр; каждый источник дает данные с вероятностью 0.8"""
+    rng = random.Random(n)
+    rows = {}
+    for i in range(n):
+        pr = PredictorRow(dateISO="2025-01-01", neutral=False, homeTeam=f"Home {i}", awayTeam=f"Away {i}")
+        for source in CONSENSUS_SOURCES:
+            if rng.random() < 0.8:
+                setattr(pr, source, SourceMetrics(
+                    spread=round(rng.uniform(-25, 25), 1),
+                    total=round(rng.uniform(115, 165), 1),
+                    winProbHome=round(rng.random(), 3),
+                ))
+        rows[str(i)] = pr
+    return rows
+
+def timed(func, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merger.finalize")
+    parser.add_argument("--games", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3, help="Лучший из N прогонов")
+    args = parser.parse_args()
+
+    print(f"{'games':>8} {'before, ms':>12} {'after, ms':>12} {'speedup':>8}")
+    for n in args.games:
+        rows = make_rows(n)
+        records = {key: GameRecord.from_row(row) for key, row in rows.items()}
+        before = timed(legacy_finalize, rows, args.repeat)
+        after = timed(finalize, records, args.repeat)
+        print(f"{n:>8} {before * 1000:>12.1f} {after * 1000:>12.1f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сборки снимка: время и память на 1000 игр до и после
+
+"До" - прежний attach, который строит PredictorRow и валидирует SourceMetrics
+на каждую строку источника, плюс цикл средних со statistics.mean.
+"После" - слотовые GameRecord с кортежами метрик и finalize, который
+считает консенсус и создает PredictorRow один раз при публикации.
+Память - то, что держит rows_map после прикрепления всех источников (tracemalloc).
+
+Примеры:
+    python scripts/bench_merge.py
+    python scripts/bench_merge.py --games 5000 --repeat 5
+"""
+import argparse
+import gc
+import random
+import sys
+import os
+import time
+import tracemalloc
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app.merger import SOURCES, GameIndex, attach, finalize, game_key
+from app.models import PredictorRow, SourceMetrics
+from scripts.bench_consensus import legacy_finalize
+
+def legacy_attach(rows, dISO, tipoff, neutral, home, away, source, metrics):
+    """Прежняя реализация (для сравнения)"""
+    key = game_key(dISO, home, away, neutral)
+    pr = rows.get(key)
+    if not pr:
+        pr = PredictorRow(dateISO=dISO, tipoffET=tipoff, neutral=neutral, homeTeam=home, awayTeam=away)
+        rows[key] = pr
+    setattr(pr, source, SourceMetrics(**metrics))
+
+def make_source_rows(n: int):
+    """Строки источников так, как их отдают скрейперы: (source, home, away, metrics)"""
+    rng = random.Random(n)
+    out = []
+    for source in SOURCES:
+        for i in range(n):
+            out.append((source, f"Home {i}", f"Away {i}", {
+                "spread": round(rng.uniform(-25, 25), 1),
+                "total": round(rng.uniform(115, 165), 1),
+                "winProbHome": round(rng.random(), 3),
+            }))
+    return out
+
+def retained_bytes(attach_func, source_rows) -> int:
+    """Сколько памяти держит rows_map после прикрепления всех строк"""
+    gc.collect()
+    tracemalloc.start()
+    rows_map = GameIndex() if attach_func is attach else {}
+    for source, home, away, metrics in source_rows:
+        attach_func(rows_map, "2025-01-01", "19:00", False, home, away, source, metrics)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot merge")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3, help="Лучший из N прогонов")
+    args = parser.parse_args()
+
+    source_rows = make_source_rows(args.games)
+    scale = 1000 / args.games
+    print(f"{args.games} games x {len(SOURCES)} sources, per 1000 games:")
+    print(f"{'':<8} {'attach, ms':>12} {'publish, ms':>12} {'total, ms':>10} {'memory, KB':>11}")
+    for label, attach_func, finalize_func in [
+        ("before", legacy_attach, legacy_finalize),
+        ("after", attach, finalize),
+    ]:
+        # tracemalloc замедляет код, поэтому время - из отдельных прогонов без него
+        retained = retained_bytes(attach_func, source_rows)
+        best = None
+        for _ in range(args.repeat):
+            rows_map = GameIndex() if attach_func is attach else {}
+            started = time.perf_counter()
+            for source, home, away, metrics in source_rows:
+                attach_func(rows_map, "2025-01-01", "19:00", False, home, away, source, metrics)
+            attached = time.perf_counter()
+            finalize_func(rows_map)
+            done = time.perf_counter()
+            timing = ((attached - started) * 1000, (done - attached) * 1000)
+            best = timing if best is None or sum(timing) < sum(best) else best
+        attach_ms, publish_ms = best
+        print(f"{label:<8} {attach_ms * scale:>12.1f} {publish_ms * scale:>12.1f} "
+              f"{(attach_ms + publish_ms) * scale:>10.1f} {retained * scale / 1024:>11.0f}")
+
+if __name__ == "__main__":
+    main()
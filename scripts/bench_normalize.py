@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк нормализации названий команд: названий в секунду до и после
+
+"До" - прежняя реализация normalize (unidecode и re.sub со строковыми шаблонами
+на каждое название), "после" - app.normalizer с готовыми шаблонами и кешем.
+Названия берутся из data/teams.csv и повторяются, как на реальном сборе:
+каждый источник присылает одни и те же команды на каждом запуске.
+
+Примеры:
+    python scripts/bench_normalize.py
+    python scripts/bench_normalize.py --rounds 200 --csv data/teams.csv
+"""
+import argparse
+import csv
+import re
+import sys
+import os
+import time
+from unidecode import unidecode
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app.normalizer import NameNormalizer
+from app.settings import settings
+
+def legacy_normalize(s: str) -> str:
+    """Прежняя реализация (для сравнения)"""
+    if not s:
+        return ""
+    
+    s = unidecode(s).lower().strip()
+    s = re.sub(r"\s+", " ", s)
+    s = s.replace("&", "and")
+    s = re.sub(r"\bst\.?\b", "state", s)
+    s = re.sub(r"\b(u|univ)\.?\b", "university", s)
+    return s
+
+def load_names(path: str):
+    """Сырые названия так, как их пишут источники: канонические и варианты"""
+    names = []
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            names += [row["canonical"], row["canonical"].upper(), f"  {row['canonical']} St. ", row["alias"]]
+    return names
+
+def bench(label: str, func, names, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(names)
+    elapsed = time.perf_counter() - started
+    rate = len(names) * rounds / elapsed
+    print(f"{label:<28} {rate:>14,.0f} names/s")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark team-name normalization")
+    parser.add_argument("--csv", default="data/teams.csv", help="CSV с колонками alias, canonical")
+    parser.add_argument("--rounds", type=int, default=100, help="Сколько раз прогнать весь список")
+    args = parser.parse_args()
+
+    names = load_names(args.csv)
+    print(f"{len(names)} names x {args.rounds} rounds")
+
+    # Результаты обеих реализаций должны совпадать
+    engine = NameNormalizer(settings.NORMALIZE_CACHE_SIZE)
+    assert [legacy_normalize(n) for n in names] == engine.normalize_many(names)
+
+    before = bench("before (re.sub per call)", lambda ns: [legacy_normalize(n) for n in ns], names, args.rounds)
+    cold = NameNormalizer(settings.NORMALIZE_CACHE_SIZE)
+    bench("after, single calls", lambda ns: [cold.normalize(n) for n in ns], names, args.rounds)
+    after = bench("after, normalize_many", engine.normalize_many, names, args.rounds)
+    print(f"speedup: {after / before:.1f}x, cache: {engine.cache_info()}")
+
+if __name__ == "__main__":
+    main()
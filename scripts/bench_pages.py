@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк главной страницы и /api/data: запросов в секунду до и после
+
+"До" - прежние обработчики: Jinja рендерит index.html на каждый запрос,
+/api/data делает model_dump всех строк и заново кодирует JSON.
+"После" - обработчики приложения: тело собрано и сжато один раз на версию
+снимка (PayloadCache), запрос - копия из памяти или 304 по If-None-Match.
+
+Запросы идут последовательно через ASGI-транспорт httpx, без сети: это
+стоимость самого обработчика. Снимок - синтетический, в локальном файле.
+
+Примеры:
+    python scripts/bench_pages.py
+    python scripts/bench_pages.py --games 1000 --seconds 3
+"""
+import argparse
+import asyncio
+import sys
+import os
+import tempfile
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+os.environ["DATA_BACKEND"] = "local"
+
+import httpx
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from app import storage
+from app.main import app, templates
+from app.formatting import get_spread_class, get_total_class, get_winprob_class
+from app.models import Snapshot
+from scripts.bench_consensus import make_rows
+
+async def legacy_home(request: Request):
+    """Прежний обработчик / (для сравнения)"""
+    snap = await storage.load_snapshot()
+    return templates.TemplateResponse("index.html", {
+        "request": request,
+        "snap": snap,
+        "get_spread_class": get_spread_class,
+        "get_total_class": get_total_class,
+        "get_winprob_class": get_winprob_class
+    })
+
+async def legacy_data():
+    """Прежний обработчик /api/data (для сравнения)"""
+    snap = await storage.load_snapshot()
+    return {
+        "status": snap.status,
+        "date": snap.etDate,
+        "games": [game.model_dump() for game in snap.rows]
+    }
+
+async def fetch(client: httpx.AsyncClient, url: str, headers: dict) -> tuple:
+    """Статус и размер тела как есть на проводе (без распаковки на клиенте)"""
+    async with client.stream("GET", url, headers=headers) as response:
+        size = 0
+        async for chunk in response.aiter_raw():
+            size += len(chunk)
+    return response.status_code, size
+
+async def rps(client: httpx.AsyncClient, url: str, headers: dict, seconds: float) -> tuple:
+    status, size = await fetch(client, url, headers)  # прогрев (и сборка тела)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        await fetch(client, url, headers)
+        count += 1
+    return count / (time.perf_counter() - started), status, size
+
+async def run(args):
+    storage.LOCAL_PATH = os.path.join(tempfile.mkdtemp(), "today.json")
+    await storage.save_snapshot(Snapshot(etDate="2025-01-01", rows=list(make_rows(args.games).values())))
+
+    app.add_api_route("/legacy/", legacy_home, response_class=HTMLResponse)
+    app.add_api_route("/legacy/api/data", legacy_data)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # ETag текущих вариантов для условных запросов
+        etag_html = (await client.get("/", headers={"Accept-Encoding": "br"})).headers["etag"]
+        etag_json = (await client.get("/api/data", headers={"Accept-Encoding": "br"})).headers["etag"]
+        cases = [
+            ("/ before", "/legacy/", {}),
+            ("/ after", "/", {"Accept-Encoding": "identity"}),
+            ("/ after, br", "/", {"Accept-Encoding": "br"}),
+            ("/ after, 304", "/", {"Accept-Encoding": "br", "If-None-Match": etag_html}),
+            ("/api/data before", "/legacy/api/data", {}),
+            ("/api/data after", "/api/data", {"Accept-Encoding": "identity"}),
+            ("/api/data after, gzip", "/api/data", {"Accept-Encoding": "gzip"}),
+            ("/api/data after, 304", "/api/data", {"Accept-Encoding": "br", "If-None-Match": etag_json}),
+        ]
+        print(f"Snapshot: {args.games} games\n")
+        print(f"{'case':<24}{'req/s':>10}{'status':>8}{'KB':>9}")
+        for name, url, headers in cases:
+            value, status, size = await rps(client, url, headers, args.seconds)
+            print(f"{name:<24}{value:>10.0f}{status:>8}{size / 1024:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page and API requests per second")
+    parser.add_argument("--games", type=int, default=150, help="Игр в снимке")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Длительность каждого замера")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
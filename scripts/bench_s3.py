@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк чтения снимка из S3: задержка на запрос до и после
+
+"До" - новая aioboto3.Session и клиент на каждый запрос (HEAD для проверки
+версии, GET для загрузки), как раньше делал storage.
+"После" - общий клиент процесса (app.s3) с пулом соединений: полный GET
+и условный GET по ETag, который для неизмененного объекта возвращает 304.
+
+Нужно S3-совместимое хранилище. Если S3_ENDPOINT_URL не задан, поднимается
+локальный moto-сервер (pip install "moto[server]"). Можно и localstack из
+docker-compose (http://localhost:4566) или MinIO.
+
+Примеры:
+    python scripts/bench_s3.py
+    S3_ENDPOINT_URL=http://localhost:4566 python scripts/bench_s3.py --games 2000 --requests 200
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import os
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+import aioboto3
+from botocore.exceptions import ClientError
+from app.models import Snapshot
+from app.settings import settings
+from app.s3 import get_s3_client, close_s3_client
+from scripts.bench_consensus import make_rows
+
+def start_moto() -> str:
+    """Локальный moto-сервер на свободном порту"""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('Set S3_ENDPOINT_URL or install moto: pip install "moto[server]"')
+    # Без лога каждого запроса
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}"
+
+def fresh_session() -> aioboto3.Session:
+    return aioboto3.Session(
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+    )
+
+async def legacy_head():
+    async with fresh_session().client("s3", endpoint_url=settings.S3_ENDPOINT_URL) as s3:
+        await s3.head_object(Bucket=settings.S3_BUCKET, Key=settings.S3_OBJECT_KEY)
+
+async def legacy_get():
+    async with fresh_session().client("s3", endpoint_url=settings.S3_ENDPOINT_URL) as s3:
+        obj = await s3.get_object(Bucket=settings.S3_BUCKET, Key=settings.S3_OBJECT_KEY)
+        await obj["Body"].read()
+
+async def pooled_get():
+    s3 = await get_s3_client()
+    obj = await s3.get_object(Bucket=settings.S3_BUCKET, Key=settings.S3_OBJECT_KEY)
+    await obj["Body"].read()
+
+def conditional_get(etag: str):
+    async def run():
+        s3 = await get_s3_client()
+        try:
+            await s3.get_object(Bucket=settings.S3_BUCKET, Key=settings.S3_OBJECT_KEY, IfNoneMatch=etag)
+        except ClientError as e:
+            if e.response["ResponseMetadata"]["HTTPStatusCode"] != 304:
+                raise
+        else:
+            raise RuntimeError("expected 304 Not Modified")
+    return run
+
+async def measure(func, requests: int) -> list:
+    await func()  # прогрев
+    times = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await func()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+async def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Benchmark S3 snapshot reads")
+    parser.add_argument("--games", type=int, default=500, help="Игр в снимке")
+    parser.add_argument("--requests", type=int, default=100, help="Запросов на вариант")
+    args = parser.parse_args()
+
+    settings.S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or start_moto()
+    settings.AWS_ACCESS_KEY_ID = settings.AWS_ACCESS_KEY_ID or "testing"
+    settings.AWS_SECRET_ACCESS_KEY = settings.AWS_SECRET_ACCESS_KEY or "testing"
+    settings.AWS_REGION = settings.AWS_REGION or "us-east-1"
+    settings.S3_BUCKET = settings.S3_BUCKET or "ncaa-bench"
+    print(f"Endpoint: {settings.S3_ENDPOINT_URL}, bucket: {settings.S3_BUCKET}")
+
+    snap = Snapshot(etDate="2025-01-01", rows=list(make_rows(args.games).values()))
+    body = snap.model_dump_json(indent=2).encode("utf-8")
+    s3 = await get_s3_client()
+    try:
+        await s3.create_bucket(Bucket=settings.S3_BUCKET)
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+            raise
+    put = await s3.put_object(Bucket=settings.S3_BUCKET, Key=settings.S3_OBJECT_KEY, Body=body)
+    print(f"Snapshot: {args.games} games, {len(body) / 1024:.0f} KB\n")
+
+    variants = [
+        ("legacy HEAD (new session)", legacy_head),
+        ("legacy GET (new session)", legacy_get),
+        ("pooled GET", pooled_get),
+        ("pooled conditional GET (304)", conditional_get(put["ETag"])),
+    ]
+    print(f"{'variant':<30}{'median ms':>12}{'p95 ms':>10}")
+    try:
+        for name, func in variants:
+            times = sorted(await measure(func, args.requests))
+            p95 = times[int(len(times) * 0.95) - 1]
+            print(f"{name:<30}{statistics.median(times):>12.2f}{p95:>10.2f}")
+    finally:
+        await close_s3_client()
+
+if __name__ == "__main__":
+    asyncio.run(main())
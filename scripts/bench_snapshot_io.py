@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк записи и чтения снимка на больших синтетических слейтах
+
+"До" - model_dump_json(indent=2) и запись файла на месте (open/write).
+"После" - dump_snapshot (компактный JSON без полей None), parse_snapshot
+(через orjson, если он установлен) и write_atomic (временный файл, fsync,
+rename). Для сравнения - сериализация через orjson.
+Время - лучший из --repeat прогонов, в миллисекундах.
+
+Примеры:
+    python scripts/bench_snapshot_io.py
+    python scripts/bench_snapshot_io.py --games 1000 20000 --repeat 5
+"""
+import argparse
+import sys
+import os
+import tempfile
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app.models import Snapshot
+from app.storage import dump_snapshot, parse_snapshot, write_atomic
+from scripts.bench_consensus import make_rows
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def best_ms(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def legacy_write(path: str, data: str):
+    """Прежняя запись (для сравнения)"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot serialization and writes")
+    parser.add_argument("--games", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=3, help="Лучший из N прогонов")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "today.json")
+    print(f"{'games':>7} {'variant':<22}{'KB':>9}{'dump ms':>10}{'parse ms':>10}{'write ms':>10}")
+    for n in args.games:
+        snap = Snapshot(etDate="2025-01-01", rows=list(make_rows(n).values()))
+
+        legacy = snap.model_dump_json(indent=2)
+        compact = dump_snapshot(snap)
+        assert parse_snapshot(compact) == snap
+
+        results = [
+            ("indent=2, in place", len(legacy.encode("utf-8")),
+             best_ms(lambda: snap.model_dump_json(indent=2), args.repeat),
+             best_ms(lambda: Snapshot.model_validate_json(legacy), args.repeat),
+             best_ms(lambda: legacy_write(path, legacy), args.repeat)),
+            ("compact, atomic", len(compact),
+             best_ms(lambda: dump_snapshot(snap), args.repeat),
+             best_ms(lambda: parse_snapshot(compact), args.repeat),
+             best_ms(lambda: write_atomic(path, compact), args.repeat)),
+        ]
+        if orjson is not None:
+            raw = orjson.dumps(snap.model_dump(exclude_none=True))
+            results.append(("orjson dumps, atomic", len(raw),
+                            best_ms(lambda: orjson.dumps(snap.model_dump(exclude_none=True)), args.repeat),
+                            best_ms(lambda: parse_snapshot(raw), args.repeat),
+                            best_ms(lambda: write_atomic(path, raw), args.repeat)))
+
+        for name, size, dump_ms, parse_ms, write_ms in results:
+            print(f"{n:>7} {name:<22}{size / 1024:>9.0f}{dump_ms:>10.1f}{parse_ms:>10.1f}{write_ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
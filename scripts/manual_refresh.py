@@ -11,6 +11,8 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.tasks import ingest_today
+from app.scrapers.pool import close_client_pool
+from app.s3 import close_s3_client
 
 async def main():
     """Ручное обновление данных"""
@@ -25,6 +27,9 @@ async def main():
     except Exception as e:
         print(f"❌ Data refresh failed: {str(e)}")
         sys.exit(1)
+    finally:
+        await close_client_pool()
+        await close_s3_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Повторный парсинг архива сырых ответов без обращения к сети
+
+Архив пишется при SCRAPER_MODE=record (см. app/scrapers/archive.py).
+Для каждого источника и каждого дня в архиве прогоняет fetch_today
+в режиме replay и печатает число игр и время парсинга.
+
+Примеры:
+    python scripts/replay_archive.py
+    python scripts/replay_archive.py --source kenpom --from 2025-01-01 --to 2025-03-31
+    python scripts/replay_archive.py --source bart --profile
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+from app.settings import settings
+from app.tasks import SCRAPERS
+from app.scrapers.archive import archive
+from app.scrapers.pool import close_client_pool
+
+def capture_days(source: str):
+    """Дни, за которые в архиве есть ответы источника"""
+    return sorted({
+        datetime.fromtimestamp(entry["ts"]).strftime("%Y-%m-%d")
+        for entry in archive.entries(source)
+    })
+
+async def replay_day(scraper_cls, day: str):
+    """Парсинг архива источника за один день"""
+    day_end = datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1) - timedelta(seconds=1)
+    archive.replay_at = day_end.timestamp()
+    async with scraper_cls() as scraper:
+        return await scraper.fetch_today()
+
+async def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Replay archived scraper responses")
+    parser.add_argument("--source", action="append", help="Колонка источника (kenpom, bart, massey, hasla, odds)")
+    parser.add_argument("--from", dest="date_from", help="Начальная дата YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="Конечная дата YYYY-MM-DD")
+    parser.add_argument("--profile", action="store_true", help="Профилировать парсинг (cProfile)")
+    args = parser.parse_args()
+
+    # Никаких сетевых запросов: все ответы берутся из архива
+    settings.SCRAPER_MODE = "replay"
+    if args.profile:
+        # cProfile видит только текущий процесс
+        settings.PARSE_EXECUTOR = "inline"
+
+    names = args.source or list(SCRAPERS)
+    profiler = cProfile.Profile() if args.profile else None
+    total_pages = 0
+    total_games = 0
+    started = time.perf_counter()
+
+    for name in names:
+        scraper_cls = SCRAPERS[name]
+        days = [
+            day for day in capture_days(scraper_cls.source)
+            if (not args.date_from or day >= args.date_from) and (not args.date_to or day <= args.date_to)
+        ]
+        if not days:
+            print(f"{name}: no archived responses")
+            continue
+
+        source_started = time.perf_counter()
+        source_games = 0
+        for day in days:
+            if profiler:
+                profiler.enable()
+            games = await replay_day(scraper_cls, day)
+            if profiler:
+                profiler.disable()
+            source_games += len(games)
+        elapsed = time.perf_counter() - source_started
+
+        total_pages += len(days)
+        total_games += source_games
+        print(f"{name}: {len(days)} days, {source_games} games, {elapsed:.2f}s")
+
+    await close_client_pool()
+    print(f"Replayed {total_pages} source-days, {total_games} games in {time.perf_counter() - started:.2f}s")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,9 +2,17 @@
 """
 Скрипт для настройки словаря команд
 Создает пример Google Sheet с командами NCAA D1
+
+С --artifact дополнительно пишет скомпилированный словарь (нормализованные
+ключи), который приложение подхватит без загрузки и разбора CSV:
+    python scripts/setup_teams.py --artifact data/alias_map.json
+source_url артефакта - TEAMLIST_CSV_URL из настроек, если не задан --source-url.
 """
+import argparse
 import csv
 import io
+import os
+import sys
 
 def create_teams_csv():
     """Создает CSV файл с командами NCAA D1"""
@@ -170,8 +178,39 @@ def create_teams_csv():
     
     return csv_content
 
+def configured_source_url() -> str:
+    """TEAMLIST_CSV_URL из настроек приложения (.env или окружение)
+
+    Артефакт с другим source_url приложение отбросит, поэтому без настройки не угадываем.
+    """
+    from pydantic import ValidationError
+    try:
+        from app.settings import settings
+    except ValidationError:
+        sys.exit("TEAMLIST_CSV_URL is not set: set it in .env or pass --source-url")
+    return settings.TEAMLIST_CSV_URL
+
+def write_artifact(csv_content: str, path: str, source_url: str):
+    """Скомпилированный словарь для AliasMapCache (app/normalizer.py)"""
+    os.environ.setdefault("TEAMLIST_CSV_URL", source_url)
+    from app.normalizer import build_alias_artifact, write_alias_artifact
+    
+    artifact = build_alias_artifact(csv_content, source_url)
+    write_alias_artifact(path, artifact)
+    print(f"Created {path}: version {artifact['version']}, {len(artifact['aliases'])} aliases for {source_url}")
+
 def main():
     """Основная функция"""
+    parser = argparse.ArgumentParser(description="Create NCAA D1 teams CSV")
+    parser.add_argument("--artifact", help="Также записать скомпилированный словарь (ALIAS_MAP_PATH)")
+    parser.add_argument("--source-url",
+                        help="TEAMLIST_CSV_URL, для которого собирается артефакт (по умолчанию из настроек)")
+    args = parser.parse_args()
+    # Добавляем путь к приложению
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if args.artifact and not args.source_url:
+        args.source_url = configured_source_url()
+    
     print("Creating NCAA D1 teams CSV...")
     
     csv_content = create_teams_csv()
@@ -181,6 +220,9 @@ def main():
         f.write(csv_content)
     
     print(f"Created teams.csv with {len(csv_content.splitlines())-1} teams")
+    
+    if args.artifact:
+        write_artifact(csv_content, args.artifact, args.source_url)
     print("\nTo use this file:")
     print("1. Upload to Google Sheets")
     print("2. Make it publicly accessible")
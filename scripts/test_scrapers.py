@@ -16,6 +16,7 @@ from app.scrapers import (
     HaslaScraper,
     TeamRankingsScraper
 )
+from app.scrapers.pool import close_client_pool
 
 async def test_scraper(scraper_class, name):
     """Тестирование одного скрейпера"""
@@ -56,6 +57,8 @@ async def main():
         await test_scraper(scraper_class, name)
         await asyncio.sleep(2)  # Задержка между тестами
     
+    await close_client_pool()
+    
     print(f"\n{'='*50}")
     print("Scraper testing completed!")
     print(f"{'='*50}")
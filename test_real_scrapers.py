@@ -18,6 +18,7 @@ from app.scrapers import (
     HaslaScraper,
     TeamRankingsScraper
 )
+from app.scrapers.pool import close_client_pool
 
 async def test_scraper(scraper_class, name):
     """Тестирование одного скрейпера"""
@@ -71,6 +72,8 @@ async def main():
         success = await test_scraper(scraper_class, name)
         results.append((name, success))
     
+    await close_client_pool()
+    
     # Итоговый отчет
     print("\n" + "=" * 70)
     print("📊 ИТОГОВЫЙ ОТЧЕТ")
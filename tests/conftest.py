@@ -0,0 +1,72 @@
+"""Общие заглушки для тестов: окружение, фальшивые скрейперы, изолированный сбор"""
+import os
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from datetime import date
+from typing import Dict, List, Optional
+import pytest
+from app import tasks
+from app.breaker import CircuitBreaker
+from app.models import Snapshot
+from app.scrapers.base import RawGame
+from app.settings import settings
+
+TEAMS = ["Duke", "UNC", "Kansas", "Baylor"]
+
+def raw_game(home: str, away: str, **metrics) -> RawGame:
+    return RawGame(date=date.fromisoformat(tasks.et_today()), tipoff_et="19:00",
+                   home=home, away=away, neutral=False, metrics=metrics)
+
+def fake_scraper(games: Optional[List[RawGame]] = None, error: Optional[Exception] = None):
+    """Класс скрейпера, который отдает games или падает с error"""
+    class FakeScraper:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            pass
+
+        async def fetch_today(self):
+            if error is not None:
+                raise error
+            return list(games or [])
+
+    return FakeScraper
+
+class IngestEnv:
+    """Сбор за сегодня без сети и файлов: снимки в памяти, свой предохранитель"""
+
+    def __init__(self, monkeypatch, tmp_path):
+        self.saved: List[Snapshot] = []
+        self.previous: Optional[Snapshot] = None
+        self.breaker = CircuitBreaker(str(tmp_path / "breaker.json"))
+        self.monkeypatch = monkeypatch
+
+        async def load_snapshot():
+            return self.saved[-1] if self.saved else self.previous
+
+        async def save_snapshot(snap):
+            self.saved.append(snap)
+
+        async def load_alias_map(url):
+            return {team.lower(): team for team in TEAMS}
+
+        monkeypatch.setattr(tasks, "load_snapshot", load_snapshot)
+        monkeypatch.setattr(tasks, "save_snapshot", save_snapshot)
+        monkeypatch.setattr(tasks, "load_alias_map", load_alias_map)
+        monkeypatch.setattr(tasks, "_record_lines", lambda *args: None)
+        monkeypatch.setattr(tasks, "circuit_breaker", self.breaker)
+        monkeypatch.setattr(settings, "INGEST_STREAMING", False)
+        monkeypatch.setattr(settings, "FUZZY_MATCH", False)
+
+    def scrapers(self, **scrapers):
+        self.monkeypatch.setattr(tasks, "SCRAPERS", scrapers)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        return self.saved[-1]
+
+@pytest.fixture
+def ingest_env(monkeypatch, tmp_path) -> IngestEnv:
+    return IngestEnv(monkeypatch, tmp_path)
@@ -0,0 +1,111 @@
+"""Предохранитель источников, падение всех URL источника и подстановка last-good данных"""
+import asyncio
+import time
+import pytest
+from app import tasks
+from app.breaker import CircuitBreaker
+from app.models import PredictorRow, Snapshot, SourceMetrics
+from app.scrapers.bart import BartScraper
+from app.scrapers.urlstats import url_stats
+from app.settings import settings
+from conftest import fake_scraper, raw_game
+
+@pytest.fixture
+def breaker(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "BREAKER_COOLDOWN_S", 60.0)
+    return CircuitBreaker(str(tmp_path / "breaker.json"))
+
+def test_breaker_opens_after_threshold(breaker):
+    for _ in range(2):
+        breaker.record_failure("bart", "boom")
+    assert breaker.allow("bart")
+    breaker.record_failure("bart", "boom")
+    assert not breaker.allow("bart")
+    assert breaker.stats()["bart"]["open"] is True
+
+def test_breaker_half_open_after_cooldown(breaker, monkeypatch):
+    for _ in range(3):
+        breaker.record_failure("bart", "boom")
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    # Остывание прошло - одна пробная попытка
+    assert breaker.allow("bart")
+    # Неудача в half-open сразу открывает предохранитель снова
+    breaker.record_failure("bart", "still down")
+    assert not breaker.allow("bart")
+
+def test_breaker_success_closes(breaker, monkeypatch):
+    for _ in range(3):
+        breaker.record_failure("bart", "boom")
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    breaker.record_success("bart")
+    breaker.record_failure("bart", "blip")
+    assert breaker.allow("bart")
+    assert breaker.stats()["bart"]["failures"] == 1
+
+def test_breaker_state_survives_restart(breaker):
+    for _ in range(3):
+        breaker.record_failure("bart", "boom")
+    breaker.save()
+    assert not CircuitBreaker(breaker.path).allow("bart")
+
+@pytest.fixture
+def isolated_url_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_stats, "path", str(tmp_path / "url_stats.json"))
+    monkeypatch.setattr(url_stats, "_data", None)
+    monkeypatch.setattr(settings, "URL_HEDGE_DELAY_S", 0.01)
+
+def test_source_raises_when_every_url_fails(isolated_url_stats, monkeypatch):
+    async def fetch_url(self, url):
+        raise RuntimeError("HTTP 503")
+    monkeypatch.setattr(BartScraper, "_fetch_url", fetch_url)
+
+    with pytest.raises(RuntimeError, match="all URLs failed"):
+        asyncio.run(BartScraper().fetch_today())
+
+def test_empty_page_is_an_empty_slate_not_a_failure(isolated_url_stats, monkeypatch):
+    async def fetch_url(self, url):
+        return []
+    monkeypatch.setattr(BartScraper, "_fetch_url", fetch_url)
+
+    assert asyncio.run(BartScraper().fetch_today()) == []
+
+def previous_snapshot() -> Snapshot:
+    return Snapshot(etDate=tasks.et_today(), rows=[PredictorRow(
+        dateISO=tasks.et_today(), tipoffET="19:00", neutral=False, homeTeam="Duke", awayTeam="UNC",
+        kenpom=SourceMetrics(spread=-3.0), bart=SourceMetrics(spread=-5.0),
+    )])
+
+def test_failed_source_is_filled_from_last_good_snapshot(ingest_env):
+    ingest_env.previous = previous_snapshot()
+    ingest_env.scrapers(
+        kenpom=fake_scraper([raw_game("Duke", "UNC", spread=-4.0)]),
+        bart=fake_scraper(error=RuntimeError("bart: all URLs failed")),
+    )
+
+    asyncio.run(tasks.ingest_today())
+
+    snap = ingest_env.snapshot
+    assert snap.status == "stale"
+    assert snap.staleSources == ["bart"]
+    row = snap.rows[0]
+    assert row.kenpom.spread == -4.0
+    assert row.bart.spread == -5.0
+    assert ingest_env.breaker.stats()["bart"]["failures"] == 1
+    assert ingest_env.breaker.stats()["kenpom"]["failures"] == 0
+
+def test_open_breaker_skips_source_and_fills_it(ingest_env, monkeypatch):
+    monkeypatch.setattr(settings, "BREAKER_FAILURE_THRESHOLD", 1)
+    ingest_env.previous = previous_snapshot()
+    ingest_env.breaker.record_failure("bart", "boom")
+    ingest_env.scrapers(
+        kenpom=fake_scraper([raw_game("Duke", "UNC", spread=-4.0)]),
+        bart=fake_scraper(error=AssertionError("must not run while the breaker is open")),
+    )
+
+    asyncio.run(tasks.ingest_today())
+
+    assert ingest_env.snapshot.staleSources == ["bart"]
+    assert ingest_env.snapshot.rows[0].bart.spread == -5.0
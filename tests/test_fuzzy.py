@@ -0,0 +1,77 @@
+"""Нечеткий поиск команд: опечатки находятся, похожие, но другие команды - нет"""
+import os
+import pytest
+from app.fuzzy import FuzzyMatcher, LearnedAliases, tokens_agree
+from app.normalizer import normalize, parse_alias_csv
+
+TEAMS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "teams.csv")
+
+@pytest.fixture(scope="module")
+def matcher() -> FuzzyMatcher:
+    with open(TEAMS_CSV, "r", encoding="utf-8", newline="") as f:
+        alias_map = parse_alias_csv(f.read())
+    return FuzzyMatcher(alias_map, threshold=0.8, margin=0.05)
+
+@pytest.mark.parametrize("raw", [
+    "Arkansas State",
+    "Tennessee Tech",
+    "UC San Diego",
+    "North Carolina A&T",
+    "Northwestern State",
+    "Kansas City",
+    "Miami (OH)",
+])
+def test_different_team_is_not_matched(matcher, raw):
+    assert matcher.match(normalize(raw)) is None
+
+@pytest.mark.parametrize("raw, canonical", [
+    ("Connecticutt", "UConn"),
+    ("Northwesterm", "Northwestern"),
+    ("Kansas Statte", "Kansas State"),
+    ("Tennesee", "Tennessee"),
+    ("University of Tennessee", "Tennessee"),
+])
+def test_typo_or_qualifier_is_matched(matcher, raw, canonical):
+    match = matcher.match(normalize(raw))
+    assert match is not None and match[0] == canonical
+
+def test_tokens_must_pair_up():
+    assert tokens_agree("state kansas", "kansas state")
+    assert tokens_agree("kansas sate", "kansas state")
+    assert tokens_agree("knasas state", "kansas state")
+    assert not tokens_agree("arkansas state", "kansas state")
+    assert not tokens_agree("uc san diego", "san diego")
+    assert not tokens_agree("tennessee tech", "tennessee")
+
+def test_learned_aliases_wait_for_review(tmp_path):
+    path = str(tmp_path / "learned_aliases.csv")
+    learned = LearnedAliases(path)
+    learned.learn("bart", "Connecticutt", "connecticutt", "UConn", "connecticut", 0.9)
+    learned.save()
+    # Повтор в другом процессе не дублирует строку очереди
+    again = LearnedAliases(path)
+    again.learn("massey", "Connecticutt", "connecticutt", "UConn", "connecticut", 0.9)
+    again.save()
+
+    with open(path, "r", encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2
+    # Пока человек не поставил approved, в точный поиск алиас не идет
+    assert learned.load() == {}
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text.replace("Connecticutt,\r\n", "Connecticutt,1\r\n"))
+    assert learned.load() == {"connecticutt": "UConn"}
+
+def test_old_format_queue_is_upgraded(tmp_path):
+    path = tmp_path / "learned_aliases.csv"
+    path.write_text("alias,canonical,score,source,raw\nkansas sate,Kansas State,0.9,bart,Kansas Sate\n")
+    learned = LearnedAliases(str(path))
+    learned.learn("bart", "Connecticutt", "connecticutt", "UConn", "connecticut", 0.9)
+    learned.save()
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == "alias,canonical,score,source,raw,approved"
+    assert len(lines) == 3
+    assert learned.load() == {}
@@ -0,0 +1,55 @@
+"""Сессия KenPom: сохраняется только после настоящего входа"""
+import asyncio
+import os
+import httpx
+import pytest
+from app.scrapers.kenpom import KenPomScraper
+from app.scrapers.sessions import SessionStore
+from app.settings import settings
+
+LOGIN_FORM = '<form><input name="email"><input type="password" name="password"></form>'
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "KENPOM_EMAIL", "user@example.com")
+    monkeypatch.setattr(settings, "KENPOM_PASSWORD", "secret")
+    monkeypatch.setattr(KenPomScraper, "session_store",
+                        SessionStore(str(tmp_path / "kenpom_session.json"), "kenpom.com"))
+    scraper = KenPomScraper()
+    scraper.session = httpx.AsyncClient()
+    return scraper
+
+def login_responses(monkeypatch, scraper, post_text):
+    async def get(self, url, **kwargs):
+        # PHPSESSID выдается еще до входа
+        self.session.cookies.set("PHPSESSID", "anonymous", domain="kenpom.com")
+        return httpx.Response(200, text=LOGIN_FORM, request=httpx.Request("GET", url))
+
+    async def post(self, url, **kwargs):
+        return httpx.Response(200, text=post_text, request=httpx.Request("POST", url))
+    monkeypatch.setattr(KenPomScraper, "_get", get)
+    monkeypatch.setattr(KenPomScraper, "_post", post)
+
+def test_failed_login_is_not_saved(scraper, monkeypatch):
+    login_responses(monkeypatch, scraper, LOGIN_FORM)
+
+    with pytest.raises(RuntimeError, match="login failed"):
+        asyncio.run(scraper._login())
+
+    assert not scraper.session_store.has_session(scraper.session)
+    assert not os.path.exists(scraper.session_store.path)
+
+def test_successful_login_is_saved_and_restored(scraper, monkeypatch):
+    login_responses(monkeypatch, scraper, "<a href='logout.php'>Logout</a>")
+
+    asyncio.run(scraper._login())
+
+    assert scraper.session_store.has_session(scraper.session)
+    other = SessionStore(scraper.session_store.path, "kenpom.com")
+    client = httpx.AsyncClient()
+    assert other.restore(client)
+    assert other.has_session(client)
+
+def test_anonymous_cookie_is_not_a_session(scraper):
+    scraper.session.cookies.set("PHPSESSID", "warmup", domain="kenpom.com")
+    assert not scraper.session_store.has_session(scraper.session)
@@ -0,0 +1,43 @@
+"""История линий: смена ориентации игры не разрывает ее историю"""
+import os
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app.lines import LineStore
+from app.models import SourceMetrics
+
+DAY = "2025-01-02"
+DUKE_HOME = f"{DAY}|Duke|UNC|0"
+UNC_HOME = f"{DAY}|UNC|Duke|1"
+
+def test_history_follows_reoriented_game(tmp_path):
+    store = LineStore(str(tmp_path))
+    store.append(DAY, [(DUKE_HOME, "bart", SourceMetrics(spread=-4.0, winProbHome=0.7))], captured_at=1.0)
+    # Более приоритетный источник перевернул игру: хозяева UNC, нейтральное поле
+    store.append(DAY, [(UNC_HOME, "bart", SourceMetrics(spread=3.5, winProbHome=0.35))], captured_at=2.0)
+
+    history = store.history(UNC_HOME)
+    assert [(h["capturedAt"], h["spread"], h["winProbHome"]) for h in history] == [(1.0, 4.0, 0.3), (2.0, 3.5, 0.35)]
+    assert [h["spread"] for h in store.history(DUKE_HOME)] == [-4.0, -3.5]
+
+def test_as_of_uses_latest_orientation(tmp_path):
+    store = LineStore(str(tmp_path))
+    store.append(DAY, [(DUKE_HOME, "massey", SourceMetrics(spread=-4.0))], captured_at=1.0)
+    store.append(DAY, [(UNC_HOME, "bart", SourceMetrics(spread=3.5))], captured_at=2.0)
+
+    assert store.as_of(DAY, 1.5) == {DUKE_HOME: {"massey": {"capturedAt": 1.0, **SourceMetrics(spread=-4.0).model_dump()}}}
+    games = store.as_of(DAY, 3.0)
+    assert list(games) == [UNC_HOME]
+    assert games[UNC_HOME]["massey"]["spread"] == 4.0
+    assert games[UNC_HOME]["bart"]["spread"] == 3.5
+
+def test_doubleheader_games_keep_separate_history(tmp_path):
+    store = LineStore(str(tmp_path))
+    store.append(DAY, [
+        (DUKE_HOME, "bart", SourceMetrics(spread=-4.0)),
+        (DUKE_HOME + "#2", "bart", SourceMetrics(spread=2.0)),
+    ], captured_at=1.0)
+
+    assert [h["spread"] for h in store.history(DUKE_HOME)] == [-4.0]
+    assert [h["spread"] for h in store.history(f"{DAY}|UNC|Duke|0#2")] == [-2.0]
+    assert store.history(f"{DAY}|Duke|Duke") == []
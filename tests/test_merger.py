@@ -0,0 +1,132 @@
+"""Сопоставление игр между источниками: смена хозяев, нейтральное поле, двойные игры"""
+import os
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app.merger import GameIndex, GameRecord, METRIC_FIELDS, attach, finalize, flip_metrics, metrics_tuple, row_keys
+
+DAY = "2025-01-02"
+METRICS = {
+    "spread": -4.5,
+    "total": 141.0,
+    "winProbHome": 0.7,
+    "projHome": 73.0,
+    "projAway": 68.5,
+    "moneylineHome": -190,
+    "moneylineAway": 160,
+}
+
+def values(rec: GameRecord, source: str) -> dict:
+    return dict(zip(METRIC_FIELDS, getattr(rec, source)))
+
+def test_flip_metrics_mirrors_the_game():
+    flipped = dict(zip(METRIC_FIELDS, flip_metrics(metrics_tuple(METRICS))))
+    assert flipped == {
+        "spread": 4.5,
+        "total": 141.0,
+        "winProbHome": 0.3,
+        "projHome": 68.5,
+        "projAway": 73.0,
+        "moneylineHome": 160,
+        "moneylineAway": -190,
+    }
+
+def test_flip_metrics_twice_is_identity():
+    original = metrics_tuple(METRICS)
+    assert flip_metrics(flip_metrics(original)) == original
+
+def test_flipped_source_is_stored_in_record_orientation():
+    rows = GameIndex()
+    attach(rows, DAY, "19:00", False, "Duke", "UNC", "kenpom", METRICS)
+    attach(rows, DAY, "19:00", False, "UNC", "Duke", "bart", METRICS)
+
+    assert len(rows) == 1
+    rec = next(iter(rows.values()))
+    assert (rec.homeTeam, rec.awayTeam) == ("Duke", "UNC")
+    assert values(rec, "kenpom") == METRICS
+    assert values(rec, "bart")["spread"] == 4.5
+    assert values(rec, "bart")["winProbHome"] == 0.3
+    assert values(rec, "bart")["moneylineHome"] == 160
+    assert rows.reconciliations == [{
+        "source": "bart",
+        "game": rec.key,
+        "reported": f"{DAY}|UNC|Duke|0",
+        "flipped": True,
+        "neutralMismatch": False,
+        "reoriented": False,
+    }]
+
+def test_higher_priority_source_reorients_the_record():
+    rows = GameIndex()
+    attach(rows, DAY, "19:00", False, "UNC", "Duke", "bart", METRICS)
+    attach(rows, DAY, "19:00", False, "Duke", "UNC", "kenpom", METRICS)
+
+    assert len(rows) == 1
+    key, rec = next(iter(rows.items()))
+    assert key == f"{DAY}|Duke|UNC|0"
+    assert (rec.homeTeam, rec.awayTeam) == ("Duke", "UNC")
+    # Метрики bart перевернуты вместе с записью, kenpom - как есть
+    assert values(rec, "bart")["spread"] == 4.5
+    assert values(rec, "kenpom") == METRICS
+    assert rows.reconciliations[0]["reoriented"] is True
+    assert rows.find(DAY, "Duke", "UNC", "19:00", "massey") == key
+
+def test_neutral_mismatch_follows_the_priority_source():
+    rows = GameIndex()
+    attach(rows, DAY, None, False, "Duke", "UNC", "massey", METRICS)
+    attach(rows, DAY, None, True, "Duke", "UNC", "kenpom", METRICS)
+    attach(rows, DAY, None, False, "Duke", "UNC", "hasla", METRICS)
+
+    assert len(rows) == 1
+    key, rec = next(iter(rows.items()))
+    assert rec.neutral is True
+    assert key == f"{DAY}|Duke|UNC|1"
+    assert values(rec, "hasla") == METRICS
+    assert [r["neutralMismatch"] for r in rows.reconciliations] == [True, True]
+    assert [r["reoriented"] for r in rows.reconciliations] == [True, False]
+    assert not any(r["flipped"] for r in rows.reconciliations)
+
+def test_doubleheader_is_matched_by_tipoff():
+    rows = GameIndex()
+    first = {"spread": -3.0}
+    second = {"spread": 2.0}
+    attach(rows, DAY, "13:00", False, "Duke", "UNC", "kenpom", first)
+    attach(rows, DAY, "19:00", False, "UNC", "Duke", "kenpom", second)
+    # Другой источник - в обратном порядке и с переставленными хозяевами
+    attach(rows, DAY, "19:00", False, "UNC", "Duke", "bart", second)
+    attach(rows, DAY, "13:00", False, "UNC", "Duke", "bart", first)
+
+    assert len(rows) == 2
+    by_tipoff = {rec.tipoffET: rec for rec in rows.values()}
+    assert values(by_tipoff["13:00"], "bart")["spread"] == 3.0
+    assert values(by_tipoff["19:00"], "bart")["spread"] == 2.0
+
+def test_doubleheader_without_tipoff_keeps_both_games():
+    rows = GameIndex()
+    attach(rows, DAY, None, False, "Duke", "UNC", "massey", {"spread": -3.0})
+    attach(rows, DAY, None, False, "Duke", "UNC", "massey", {"spread": 2.0})
+    # Другой источник заполняет обе игры по очереди, а не одну дважды
+    attach(rows, DAY, None, False, "Duke", "UNC", "bart", {"spread": -2.5})
+    attach(rows, DAY, None, False, "Duke", "UNC", "bart", {"spread": 1.5})
+
+    assert list(rows) == [f"{DAY}|Duke|UNC|0", f"{DAY}|Duke|UNC|0#2"]
+    assert [values(rec, "massey")["spread"] for rec in rows.values()] == [-3.0, 2.0]
+    assert [values(rec, "bart")["spread"] for rec in rows.values()] == [-2.5, 1.5]
+
+    published = finalize(rows)
+    assert row_keys(published) == list(rows)
+    refreshed = GameIndex(dict(zip(row_keys(published), map(GameRecord.from_row, published))))
+    assert list(refreshed) == list(rows)
+
+def test_published_rows_keep_their_orientation():
+    rows = GameIndex()
+    attach(rows, DAY, "19:00", False, "Duke", "UNC", "bart", METRICS)
+    published = finalize(rows)
+
+    refreshed = GameIndex({row.dateISO: GameRecord.from_row(row) for row in published})
+    attach(refreshed, DAY, "19:00", False, "UNC", "Duke", "kenpom", METRICS)
+
+    rec = next(iter(refreshed.values()))
+    assert (rec.homeTeam, rec.awayTeam) == ("Duke", "UNC")
+    assert values(rec, "kenpom")["winProbHome"] == 0.3
+    assert refreshed.reconciliations[0]["reoriented"] is False
@@ -0,0 +1,73 @@
+"""Готовые ответы API: выбор сжатия, 304 по ETag, сборка один раз на снимок"""
+import asyncio
+import gzip
+from conftest import TEAMS
+from fastapi import Request
+from app.models import Snapshot
+from app.payloads import Payload, PayloadCache, brotli
+
+BODY = b'{"rows": []}' * 100
+
+def request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/data",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+def test_encoding_follows_accept_encoding():
+    payload = Payload(BODY, "application/json")
+
+    plain = payload.response(request())
+    assert plain.body == BODY and "content-encoding" not in plain.headers
+
+    gzipped = payload.response(request(accept_encoding="gzip, deflate"))
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gzipped.body) == BODY
+
+    refused = payload.response(request(accept_encoding="gzip;q=0, identity"))
+    assert refused.body == BODY
+    if brotli is not None:
+        assert payload.response(request(accept_encoding="gzip, br")).headers["content-encoding"] == "br"
+
+    etags = {plain.headers["etag"], gzipped.headers["etag"]}
+    assert len(etags) == 2
+    for response in (plain, gzipped):
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["cache-control"] == "no-cache"
+
+def test_matching_etag_gets_304():
+    payload = Payload(BODY, "application/json")
+    etag = payload.response(request(accept_encoding="gzip")).headers["etag"]
+
+    cached = payload.response(request(accept_encoding="gzip", if_none_match=etag))
+    assert cached.status_code == 304 and cached.body == b""
+    assert cached.headers["etag"] == etag and cached.headers["vary"] == "Accept-Encoding"
+    # Слабый валидатор от прокси и список тегов тоже подходят
+    assert payload.response(request(if_none_match=f'"other", W/{etag}')).status_code == 304
+    assert payload.response(request(if_none_match='"other"')).status_code == 200
+
+def test_payload_is_built_once_per_snapshot_and_reused_for_same_content():
+    builds = []
+
+    def build(snap):
+        builds.append(snap)
+        return f'{{"rows": {len(snap.rows)}}}'.encode()
+
+    cache = PayloadCache(build, "application/json")
+    snap = Snapshot(etDate="2025-01-02")
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get(snap) for _ in range(5)))
+        # Тот же снимок, перечитанный заново: тело собирается, сжатие - нет
+        same = await cache.get(Snapshot(etDate="2025-01-02"))
+        changed = await cache.get(Snapshot(etDate="2025-01-02", rows=[{
+            "dateISO": "2025-01-02", "neutral": False, "homeTeam": TEAMS[0], "awayTeam": TEAMS[1]}]))
+        return first, same, changed
+
+    first, same, changed = asyncio.run(scenario())
+    assert all(payload is first[0] for payload in first)
+    assert same is first[0]
+    assert changed is not first[0] and changed.bodies["identity"] == b'{"rows": 1}'
+    assert len(builds) == 3
@@ -0,0 +1,85 @@
+"""SQLite-хранилище снимков: миграции старой схемы и чтение сохраненного"""
+import asyncio
+import os
+import sqlite3
+import pytest
+
+os.environ.setdefault("TEAMLIST_CSV_URL", "file://data/teams.csv")
+
+from app import sqlite_store
+from app.models import PredictorRow, Snapshot, SourceMetrics
+from app.settings import settings
+
+DAY = "2025-01-02"
+
+# Схема первой версии: без stale_sources и без статистик консенсуса сверх avg_*
+OLD_SCHEMA = """
+CREATE TABLE snapshots (et_date TEXT PRIMARY KEY, status TEXT NOT NULL, saved_at REAL NOT NULL);
+CREATE TABLE games (
+    et_date TEXT NOT NULL, game_key TEXT NOT NULL, tipoff_et TEXT, neutral INTEGER NOT NULL,
+    away_team TEXT NOT NULL, home_team TEXT NOT NULL,
+    avg_spread REAL, avg_total REAL, avg_win_prob_home REAL,
+    PRIMARY KEY (et_date, game_key)
+);
+CREATE TABLE game_sources (
+    et_date TEXT NOT NULL, game_key TEXT NOT NULL, source TEXT NOT NULL,
+    spread REAL, total REAL, win_prob_home REAL, proj_home REAL, proj_away REAL,
+    moneyline_home INTEGER, moneyline_away INTEGER,
+    PRIMARY KEY (et_date, game_key, source)
+);
+"""
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "predictor.db")
+    monkeypatch.setattr(settings, "SQLITE_PATH", path)
+    monkeypatch.setattr(sqlite_store, "_initialized", False)
+    return path
+
+def row(home: str, away: str, tipoff=None, **sources) -> PredictorRow:
+    return PredictorRow(dateISO=DAY, tipoffET=tipoff, neutral=False, homeTeam=home, awayTeam=away,
+                        avgSpread=-3.0, medianSpread=-3.0, sourceCount=len(sources), **sources)
+
+def test_old_database_is_migrated_on_load(db):
+    conn = sqlite3.connect(db)
+    conn.executescript(OLD_SCHEMA)
+    conn.execute("INSERT INTO snapshots VALUES (?, 'ok', 1.0)", (DAY,))
+    conn.execute("INSERT INTO games VALUES (?, ?, '19:00', 0, 'UNC', 'Duke', -3.0, 141.0, 0.6)",
+                 (DAY, f"{DAY}|Duke|UNC|0"))
+    conn.execute("INSERT INTO game_sources VALUES (?, ?, 'bart', -3.0, 141.0, 0.6, NULL, NULL, NULL, NULL)",
+                 (DAY, f"{DAY}|Duke|UNC|0"))
+    conn.commit()
+    conn.close()
+
+    snap = asyncio.run(sqlite_store.load_snapshot())
+
+    assert snap.etDate == DAY and snap.staleSources == []
+    [game] = snap.rows
+    assert (game.homeTeam, game.avgSpread, game.medianSpread, game.sourceCount) == ("Duke", -3.0, None, 0)
+    assert game.bart == SourceMetrics(spread=-3.0, total=141.0, winProbHome=0.6)
+    columns = {r[1] for r in sqlite3.connect(db).execute("PRAGMA table_info(games)")}
+    assert {"median_spread", "weighted_win_prob_home", "source_count"} <= columns
+
+def test_snapshot_round_trip_keeps_doubleheader(db):
+    first = row("Duke", "UNC", bart=SourceMetrics(spread=-3.0, moneylineHome=-150))
+    second = row("Duke", "UNC", massey=SourceMetrics(spread=2.0))
+    other = row("Kansas", "Baylor", "20:00", bart=SourceMetrics(spread=-1.0))
+    snap = Snapshot(status="stale", etDate=DAY, rows=[first, second, other], staleSources=["massey"])
+
+    asyncio.run(sqlite_store.save_snapshot(snap))
+    loaded = asyncio.run(sqlite_store.load_snapshot(DAY))
+
+    assert loaded.status == "stale" and loaded.staleSources == ["massey"]
+    assert sorted(loaded.rows, key=lambda r: r.model_dump_json()) == sorted(snap.rows, key=lambda r: r.model_dump_json())
+    assert asyncio.run(sqlite_store.load_snapshot("2025-01-03")) is None
+
+    by_source = asyncio.run(sqlite_store.query_games(DAY, DAY, source="bart"))
+    assert {r.homeTeam for r in by_source} == {"Duke", "Kansas"}
+    assert asyncio.run(sqlite_store.query_games(DAY, DAY, team="Baylor")) == [other]
+
+def test_save_replaces_the_day(db):
+    asyncio.run(sqlite_store.save_snapshot(Snapshot(etDate=DAY, rows=[row("Duke", "UNC"), row("Kansas", "Baylor")])))
+    asyncio.run(sqlite_store.save_snapshot(Snapshot(etDate=DAY, rows=[row("Kansas", "Baylor")])))
+
+    assert [r.homeTeam for r in asyncio.run(sqlite_store.load_snapshot(DAY)).rows] == ["Kansas"]
+    assert asyncio.run(sqlite_store.snapshot_dates()) == [DAY]
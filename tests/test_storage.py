@@ -0,0 +1,146 @@
+"""Кеш снимка в процессе: перечитывание только при смене версии в хранилище"""
+import asyncio
+import os
+from conftest import TEAMS
+import pytest
+from botocore.exceptions import ClientError
+from app import storage
+from app.models import PredictorRow, Snapshot
+from app.settings import settings
+from app.storage import SnapshotCache, dump_snapshot, write_atomic
+
+def snapshot(n: int) -> Snapshot:
+    rows = [PredictorRow(dateISO="2025-01-02", neutral=False, homeTeam=TEAMS[i % 4], awayTeam=TEAMS[(i + 1) % 4])
+            for i in range(n)]
+    return Snapshot(etDate="2025-01-02", rows=rows)
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Счетчик разборов JSON снимка"""
+    calls = []
+    parse = storage.parse_snapshot
+    monkeypatch.setattr(storage, "parse_snapshot", lambda data: calls.append(1) or parse(data))
+    monkeypatch.setattr(settings, "SNAPSHOT_CACHE", True)
+    return calls
+
+def test_local_file_is_parsed_once_per_version(tmp_path, monkeypatch, parses):
+    path = str(tmp_path / "today.json")
+    monkeypatch.setattr(settings, "DATA_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_PATH", path)
+    cache = SnapshotCache()
+
+    async def scenario():
+        assert await cache.get() is None
+        write_atomic(path, dump_snapshot(snapshot(1)))
+        first = await cache.get()
+        assert await cache.get() is first
+        # Другой процесс переписал файл: новый mtime и размер
+        write_atomic(path, dump_snapshot(snapshot(3)))
+        return first, await cache.get()
+
+    first, second = asyncio.run(scenario())
+    assert len(first.rows) == 1 and len(second.rows) == 3
+    assert len(parses) == 2
+
+def test_s3_revalidates_by_etag(monkeypatch, parses):
+    monkeypatch.setattr(settings, "DATA_BACKEND", "s3")
+    monkeypatch.setattr(settings, "SNAPSHOT_REVALIDATE_S", 0.0)
+    requests = []
+    # Ответы S3 на очередные GET: (изменился ли, снимок, ETag)
+    responses = [
+        (True, snapshot(1), '"v1"'),
+        (False, None, '"v1"'),  # 304
+        (False, None, None),    # S3 недоступен
+        (True, snapshot(2), '"v2"'),
+    ]
+
+    async def fetch_from_s3(etag=None):
+        requests.append(etag)
+        return responses.pop(0)
+
+    monkeypatch.setattr(storage, "_fetch_from_s3", fetch_from_s3)
+    cache = SnapshotCache()
+
+    async def scenario():
+        return [await cache.get() for _ in range(4)]
+
+    first, not_modified, unavailable, changed = asyncio.run(scenario())
+    assert requests == [None, '"v1"', '"v1"', '"v1"']
+    assert not_modified is first and unavailable is first
+    assert len(changed.rows) == 2
+
+def test_s3_is_not_asked_within_revalidate_interval(monkeypatch, parses):
+    monkeypatch.setattr(settings, "DATA_BACKEND", "s3")
+    monkeypatch.setattr(settings, "SNAPSHOT_REVALIDATE_S", 60.0)
+    requests = []
+
+    async def fetch_from_s3(etag=None):
+        requests.append(etag)
+        return True, snapshot(1), '"v1"'
+
+    monkeypatch.setattr(storage, "_fetch_from_s3", fetch_from_s3)
+    cache = SnapshotCache()
+
+    async def scenario():
+        await asyncio.gather(*(cache.get() for _ in range(10)))
+        # Свой save_snapshot кладет снимок в кеш без запроса к S3
+        await cache.put(snapshot(2), '"v2"')
+        return await cache.get()
+
+    assert len(asyncio.run(scenario()).rows) == 2
+    assert requests == [None]
+
+class FakeS3:
+    """get_object с ответами S3: 304 на совпавший If-None-Match, NoSuchKey без объекта"""
+
+    def __init__(self):
+        self.objects = {}
+
+    async def get_object(self, Bucket, Key, IfNoneMatch=None):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}, "ResponseMetadata": {"HTTPStatusCode": 404}}, "GetObject")
+        etag, data = self.objects[Key]
+        if IfNoneMatch == etag:
+            raise ClientError({"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+
+        class Body:
+            async def read(self):
+                return data
+        return {"Body": Body(), "ETag": etag}
+
+def test_fetch_from_s3_conditional_get(monkeypatch, parses):
+    s3 = FakeS3()
+
+    async def get_s3_client():
+        return s3
+
+    monkeypatch.setattr(storage, "get_s3_client", get_s3_client)
+    monkeypatch.setattr(storage, "s3_configured", lambda: True)
+
+    async def scenario():
+        missing = await storage._fetch_from_s3()
+        s3.objects[settings.S3_OBJECT_KEY] = ('"v1"', dump_snapshot(snapshot(2)))
+        changed, snap, etag = await storage._fetch_from_s3('"v0"')
+        return missing, (changed, len(snap.rows), etag), await storage._fetch_from_s3('"v1"')
+
+    missing, changed, not_modified = asyncio.run(scenario())
+    assert missing == (True, None, None)
+    assert changed == (True, 2, '"v1"')
+    assert not_modified == (False, None, '"v1"')
+    assert len(parses) == 1
+
+def test_write_atomic_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / "today.json")
+    write_atomic(path, b"old")
+    write_atomic(path, b"new")
+    assert open(path, "rb").read() == b"new"
+
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", broken_replace)
+    with pytest.raises(OSError):
+        write_atomic(path, b"partial")
+    # Прежняя версия цела, временный файл убран
+    assert open(path, "rb").read() == b"new"
+    assert os.listdir(tmp_path) == ["today.json"]
@@ -0,0 +1,55 @@
+"""Потоковая выдача игр источника (stream_today)"""
+import asyncio
+import pytest
+from app.scrapers import base
+from app.scrapers.hasla import HaslaScraper
+from app.scrapers.urlstats import url_stats
+from app.settings import settings
+
+PAGE = """<table><tr><th>Time</th></tr>
+<tr><td>7:00 PM</td><td>UNC</td><td>Duke</td><td>-4.5</td><td>141</td><td>0.7</td></tr>
+<tr><td>9:00 PM</td><td>Baylor</td><td>Kansas</td><td>-2.0</td><td>138</td><td>0.6</td></tr>
+</table>"""
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_stats, "path", str(tmp_path / "url_stats.json"))
+    monkeypatch.setattr(url_stats, "_data", None)
+    monkeypatch.setattr(settings, "PARSE_EXECUTOR", "inline")
+
+def serve(monkeypatch, text):
+    async def fetch_page(self, url):
+        return text
+    monkeypatch.setattr(HaslaScraper, "_fetch_page", fetch_page)
+
+def stream():
+    async def collect():
+        return [game async for game in HaslaScraper().stream_today()]
+    return asyncio.run(collect())
+
+def test_stream_parses_through_the_parse_pool(monkeypatch):
+    serve(monkeypatch, PAGE)
+    calls = []
+    run_parse = base.run_parse
+
+    async def counting_run_parse(scraper_cls, text):
+        calls.append(scraper_cls)
+        return await run_parse(scraper_cls, text)
+    monkeypatch.setattr(base, "run_parse", counting_run_parse)
+
+    games = stream()
+
+    assert [(g.away, g.home) for g in games] == [("UNC", "Duke"), ("Baylor", "Kansas")]
+    assert calls == [HaslaScraper]
+
+def test_stream_raises_on_a_broken_page(monkeypatch):
+    # Страница без таблиц - ошибка разбора, а не пустой слейт
+    serve(monkeypatch, "<html><body>maintenance</body></html>")
+
+    with pytest.raises(RuntimeError, match="all URLs failed"):
+        stream()
+
+def test_stream_of_an_empty_table_is_an_empty_slate(monkeypatch):
+    serve(monkeypatch, "<table><tr><th>Time</th></tr></table>")
+
+    assert stream() == []
@@ -0,0 +1,60 @@
+"""Обновление одного источника в снимке за сегодня (refresh_source)"""
+import asyncio
+from app import tasks
+from app.models import PredictorRow, Snapshot, SourceMetrics
+from conftest import fake_scraper, raw_game
+
+def today_snapshot() -> Snapshot:
+    return Snapshot(etDate=tasks.et_today(), rows=[PredictorRow(
+        dateISO=tasks.et_today(), tipoffET="19:00", neutral=False, homeTeam="Duke", awayTeam="UNC",
+        kenpom=SourceMetrics(spread=-3.0), odds=SourceMetrics(spread=-3.5, moneylineHome=-160),
+    )])
+
+def test_refresh_updates_only_the_source_column(ingest_env):
+    ingest_env.previous = today_snapshot()
+    ingest_env.scrapers(odds=fake_scraper([raw_game("Duke", "UNC", spread=-5.0)]))
+
+    asyncio.run(tasks.refresh_source("odds"))
+
+    row = ingest_env.snapshot.rows[0]
+    assert row.odds.spread == -5.0
+    assert row.kenpom.spread == -3.0
+    assert ingest_env.breaker.stats()["odds"]["failures"] == 0
+
+def test_empty_refresh_keeps_previous_column(ingest_env):
+    ingest_env.previous = today_snapshot()
+    ingest_env.scrapers(odds=fake_scraper([]))
+
+    asyncio.run(tasks.refresh_source("odds"))
+
+    # Ничего не переопубликовано, прежние линии на месте
+    assert ingest_env.saved == []
+    assert ingest_env.breaker.stats()["odds"]["failures"] == 1
+
+def test_failed_refresh_keeps_previous_column(ingest_env):
+    ingest_env.previous = today_snapshot()
+    ingest_env.scrapers(odds=fake_scraper(error=RuntimeError("odds: all URLs failed")))
+
+    asyncio.run(tasks.refresh_source("odds"))
+
+    assert ingest_env.saved == []
+    assert "all URLs failed" in ingest_env.breaker.stats()["odds"]["last_error"]
+
+def test_empty_refresh_of_source_without_games_is_fine(ingest_env):
+    ingest_env.previous = today_snapshot()
+    ingest_env.scrapers(bart=fake_scraper([]))
+
+    asyncio.run(tasks.refresh_source("bart"))
+
+    assert ingest_env.breaker.stats()["bart"]["failures"] == 0
+
+def test_refresh_without_today_snapshot_skips(ingest_env):
+    ingest_env.scrapers(odds=fake_scraper(error=AssertionError("must not fetch")))
+
+    async def refresh_all():
+        # Рейтинги обновляются в одном cron-слоте - параллельно
+        await asyncio.gather(*(tasks.refresh_source("odds") for _ in range(4)))
+
+    asyncio.run(refresh_all())
+
+    assert ingest_env.saved == []
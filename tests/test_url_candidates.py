@@ -0,0 +1,84 @@
+"""Запасные URL источника: гонка с хеджированием и память о рабочих URL"""
+import asyncio
+import json
+from conftest import raw_game
+import pytest
+from app.scrapers import base
+from app.scrapers.base import Scraper
+from app.scrapers.urlstats import UrlStats
+from app.settings import settings
+
+GAMES = [raw_game("Duke", "UNC", spread=-3.0)]
+
+class CandidateScraper(Scraper):
+    source = "bart"
+
+    def __init__(self):
+        # Сеть не нужна: страницы отдает fetch_url теста
+        pass
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    stats = UrlStats(str(tmp_path / "url_stats.json"))
+    monkeypatch.setattr(base, "url_stats", stats)
+    monkeypatch.setattr(settings, "URL_HEDGE_DELAY_S", 0.05)
+    monkeypatch.setattr(settings, "URL_HEDGE_MAX_PARALLEL", 2)
+    return stats
+
+def pages(delays: dict, started: list, cancelled: list):
+    """fetch_url: URL -> (задержка, игры или исключение)"""
+    async def fetch_url(url):
+        started.append(url)
+        delay, result = delays[url]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return fetch_url
+
+def test_hedged_candidate_wins_and_slow_one_is_cancelled(stats):
+    started, cancelled = [], []
+    fetch_url = pages({
+        "a": (0, RuntimeError("HTTP 503")),
+        "b": (1.0, GAMES),
+        "c": (0, GAMES),
+    }, started, cancelled)
+
+    games = asyncio.run(CandidateScraper()._fetch_candidates(["a", "b", "c"], fetch_url))
+
+    assert games == GAMES
+    # b завис, через URL_HEDGE_DELAY_S стартовал c и выиграл, b отменен
+    assert started == ["a", "b", "c"] and cancelled == ["b"]
+    assert stats.stats()["bart"]["last_good"] == "c"
+
+def test_url_stats_persist_and_reorder_candidates(stats, tmp_path):
+    fetch_url = pages({"a": (0, RuntimeError("timeout")), "b": (0, GAMES)}, [], [])
+    asyncio.run(CandidateScraper()._fetch_candidates(["a", "b"], fetch_url))
+
+    with open(tmp_path / "url_stats.json", encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["bart"]["last_good"] == "b"
+    assert saved["bart"]["urls"]["a"] == {"ok": 0, "fail": 1}
+    assert saved["bart"]["urls"]["b"]["ok"] == 1
+    # Следующий запуск (новый процесс) начинает с рабочего URL
+    assert UrlStats(str(tmp_path / "url_stats.json")).order("bart", ["a", "b"]) == ["b", "a"]
+
+def test_all_candidates_failing_is_an_error(stats):
+    fetch_url = pages({"a": (0, RuntimeError("HTTP 500")), "b": (0, RuntimeError("HTTP 502"))}, [], [])
+    with pytest.raises(RuntimeError, match="all URLs failed"):
+        asyncio.run(CandidateScraper()._fetch_candidates(["a", "b"], fetch_url))
+
+def test_empty_page_is_not_a_failure(stats):
+    fetch_url = pages({"a": (0, []), "b": (0, [])}, [], [])
+    assert asyncio.run(CandidateScraper()._fetch_candidates(["a", "b"], fetch_url)) == []
+
+def test_replay_does_not_touch_url_stats(stats, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SCRAPER_MODE", "replay")
+    fetch_url = pages({"a": (0, GAMES)}, [], [])
+    asyncio.run(CandidateScraper()._fetch_candidates(["a"], fetch_url))
+    assert stats.stats() == {"bart": {"last_good": None, "urls": {}}}
+    assert not (tmp_path / "url_stats.json").exists()